@@ -0,0 +1,403 @@
+"""
+Offline benchmark suite for the ingestion and dashboard hot paths
+
+Generates synthetic Company/Metric/Date/Value datasets of increasing size,
+times the dashboard's load, filter, split, aggregate, search and figure
+steps on them, and runs automated_data_collection end to end against a
+local HTTP stand-in that replays Yahoo/SEC/Macrotrends payloads. Results are
+printed (or written) as JSON so runs can be compared.
+
+Usage:
+    python benchmark.py --sizes 144 10000 100000 --output bench.json
+    python benchmark.py --fixtures recorded/   # replay recorded payloads
+"""
+
+import argparse
+import http.server
+import json
+import logging
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dashboard_analytics import AnalyticsEngine
+from dashboard_data import IndexedDataset
+from dashboard_figures import FIGURE_BUILDERS, build_figure
+from data_automation_script import (
+    DEFAULT_CIKS,
+    DEFAULT_COMPANIES,
+    MACROTRENDS_SLUGS,
+    MACROTRENDS_STATEMENTS,
+    SEC_CONCEPTS,
+    SEC_INSTANT_CONCEPTS,
+    FinancialDataAutomator,
+    _frame_to_payload,
+    _payload_to_frame,
+)
+from data_store import LONG_COLUMNS, _discover_store, normalize_long, read_store, write_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [144, 10_000, 100_000, 1_000_000]
+
+BASE_METRICS = ['Revenue', 'Cost Of Goods Sold', 'Gross Profit', 'Inventory', 'Cash On Hand', 'Inventory Turnover']
+
+# Above this many rows the legacy (pre-index) implementations are not timed
+LEGACY_MAX_ROWS = 1_000_000
+
+# Untracked filers in every synthetic SEC frame, next to the tracked ones
+FRAME_FILERS = 5_000
+
+
+def synthetic_dataset(n_rows, seed=0):
+    """
+    Long-format dataset of roughly ``n_rows`` rows with the shape of
+    processed_inventory_data.csv: every company has every metric on a shared
+    quarterly calendar
+    """
+    rng = np.random.default_rng(seed)
+    n_metrics = len(BASE_METRICS)
+    n_dates = int(min(max(n_rows // (n_metrics * 4), 6), 400))
+    n_companies = max(int(np.ceil(n_rows / (n_metrics * n_dates))), 1)
+    dates = pd.date_range('1990-03-31', periods=n_dates, freq='QE')
+
+    companies = np.repeat([f"C{i:05d}" for i in range(n_companies)], n_metrics * n_dates)
+    metrics = np.tile(np.repeat(BASE_METRICS, n_dates), n_companies)
+    all_dates = np.tile(dates.values, n_companies * n_metrics)
+    values = np.round(rng.lognormal(mean=8, sigma=1, size=len(companies)), 2)
+    df = pd.DataFrame({'Company': companies, 'Metric': metrics, 'Date': all_dates, 'Value': values})
+    return df.iloc[:n_rows].reset_index(drop=True)
+
+
+def time_call(func, repeat=3):
+    """
+    Run ``func`` ``repeat`` times and return (median seconds, last result)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def bench_dashboard(n_rows, workdir, repeat=3):
+    """
+    Time the dashboard hot paths on a synthetic dataset of ``n_rows`` rows
+    """
+    results = []
+
+    def record(name, func, repeat=repeat):
+        seconds, result = time_call(func, repeat)
+        results.append({'benchmark': name, 'rows': n_rows, 'seconds': seconds, 'repeat': repeat})
+        return result
+
+    df = synthetic_dataset(n_rows)
+    csv_path = os.path.join(workdir, f"data_{n_rows}.csv")
+    store_dir = os.path.join(workdir, f"store_{n_rows}")
+    df.to_csv(csv_path, index=False)
+    write_store(df, store_dir)
+
+    def load_csv():
+        loaded = pd.read_csv(csv_path)
+        loaded['Date'] = pd.to_datetime(loaded['Date'])
+        return loaded
+
+    record('load_csv', load_csv, repeat=1)
+    stored = record('load_store', lambda: read_store(store_dir), repeat=1)
+    record('legacy_load_store_discovery', lambda: normalize_long(_discover_store(store_dir, LONG_COLUMNS)), repeat=1)
+    dataset = record('build_index', lambda: IndexedDataset(stored, normalized=True), repeat=1)
+    results.append({
+        'benchmark': 'frame_memory_bytes',
+        'rows': n_rows,
+        'object_float64': int(df.astype({'Company': object, 'Metric': object}).memory_usage(deep=True).sum()),
+        'canonical': int(dataset.frame.memory_usage(deep=True).sum()),
+    })
+    snapshot_path = os.path.join(workdir, f"snapshot_{n_rows}.arrow")
+    record('write_snapshot', lambda: dataset.write_snapshot(snapshot_path), repeat=1)
+    record('load_snapshot', lambda: IndexedDataset.from_snapshot(snapshot_path), repeat=1)
+
+    companies = dataset.companies[: max(len(dataset.companies) // 2, 1)]
+    start, end = dataset.date_bounds()
+    start = start + (end - start) / 4
+
+    filtered = record('filter_companies_dates', lambda: dataset.select(None, companies, start, end))
+    record('split_metrics', lambda: [dataset.select(metric, companies, start, end) for metric in BASE_METRICS])
+    revenue = dataset.select('Revenue', companies, start, end)
+    record('groupby_company_mean', lambda: revenue.groupby('Company', observed=True)['Value'].mean())
+    record('aggregate_company_mean', lambda: dataset.aggregate('Revenue', companies, start, end))
+    record('summarize_kpis', lambda: [dataset.summarize(metric, companies, start, end) for metric in BASE_METRICS])
+    record('search', lambda: dataset.search('c0001', positions=filtered.index.to_numpy()))
+
+    if n_rows <= LEGACY_MAX_ROWS:
+        record('legacy_filter_masks', lambda: [
+            df[df['Company'].isin(companies) & (df['Date'] >= start) & (df['Date'] <= end) & (df['Metric'] == metric)]
+            for metric in BASE_METRICS
+        ])
+        plain = filtered.astype({'Company': str, 'Metric': str})
+        record('legacy_search_mask', lambda: plain[
+            plain.astype(str).apply(lambda x: x.str.contains('c0001', case=False, na=False)).any(axis=1)
+        ], repeat=1)
+
+    analytics = AnalyticsEngine(dataset)
+    record('analytics_build_matrix', lambda: AnalyticsEngine(dataset).matrix('Revenue'), repeat=1)
+    analytics.matrix('Revenue')
+    record('focus_summary', lambda: analytics.summary('Revenue', companies))
+    record('focus_correlation', lambda: analytics.correlation('Revenue', companies))
+    record('focus_correlation_date_range', lambda: analytics.correlation('Revenue', companies, start, end))
+    if n_rows <= LEGACY_MAX_ROWS:
+        record('legacy_focus_pivot_corr', lambda: revenue.pivot_table(
+            index='Date', columns='Company', values='Value', observed=True
+        ).corr(), repeat=1)
+
+    figure_metrics = {
+        'revenue_trend': 'Revenue',
+        'inventory_trend': 'Inventory',
+        'average_by_company': 'Revenue',
+        'distribution_by_company': 'Revenue',
+        'cogs_vs_gross_profit': ('Cost Of Goods Sold', 'Gross Profit'),
+        'cash_trend': 'Cash On Hand',
+        'turnover_scatter': 'Inventory Turnover',
+        'qoq_growth': 'Revenue',
+    }
+    figure_companies = companies[:20]
+    for name in FIGURE_BUILDERS:
+        metric = figure_metrics[name]
+        rows = dataset.select(metric, figure_companies, start, end)
+        record(f"figure_{name}", lambda: build_figure(name, rows, metric if isinstance(metric, str) else None),
+               repeat=1)
+
+    return results
+
+
+def synthetic_payloads(symbols):
+    """
+    Deterministic stand-ins for the upstream responses, keyed by URL path
+    """
+    rng = np.random.default_rng(1)
+    dates = pd.date_range('2023-03-31', periods=8, freq='QE')[::-1]
+    payloads = {}
+    for symbol in symbols:
+        financials = pd.DataFrame(
+            rng.lognormal(21, 0.5, size=(3, len(dates))),
+            index=['Total Revenue', 'Cost Of Revenue', 'Gross Profit'], columns=dates,
+        )
+        balance_sheet = pd.DataFrame(
+            rng.lognormal(21, 0.5, size=(2, len(dates))),
+            index=['Inventory', 'Cash And Cash Equivalents'], columns=dates,
+        )
+        payloads[f"/yahoo/{symbol}.json"] = json.dumps({
+            'financials': _frame_to_payload(financials),
+            'balance_sheet': _frame_to_payload(balance_sheet),
+        }).encode('utf-8')
+        slug = MACROTRENDS_SLUGS.get(symbol, symbol.lower())
+        for statement, metrics in MACROTRENDS_STATEMENTS.items():
+            records = [
+                {
+                    'field_name': f"<a href='/stocks/charts/{symbol}/{slug}/{metric}'>{metric}</a>",
+                    'popup_icon': '',
+                    **{f"{date:%Y-%m-%d}": f"{value:.2f}" for date, value in zip(dates, values)},
+                }
+                for metric, values in zip(metrics, rng.lognormal(9, 0.5, size=(len(metrics), len(dates))))
+            ]
+            payloads[f"/stocks/charts/{symbol}/{slug}/{statement}"] = (
+                f"<html><body><script>var originalData = {json.dumps(records)};</script></body></html>"
+            ).encode('utf-8')
+    for symbol, cik in DEFAULT_CIKS.items():
+        facts = [
+            {'end': date.strftime('%Y-%m-%d'), 'val': float(value), 'frame': f"CY{date.year}Q{date.quarter}"}
+            for date, value in zip(dates, rng.lognormal(21, 0.5, size=len(dates)))
+        ]
+        payloads[f"/api/xbrl/companyfacts/CIK{cik:010d}.json"] = json.dumps({
+            'cik': cik,
+            'entityName': symbol,
+            'facts': {'us-gaap': {'Revenues': {'units': {'USD': facts}}}},
+        }).encode('utf-8')
+    filers = [*DEFAULT_CIKS.values(), *range(2_000_000, 2_000_000 + FRAME_FILERS)]
+    for concept in SEC_CONCEPTS:
+        for date in dates:
+            frame = f"CY{date.year}Q{date.quarter}{'I' if concept in SEC_INSTANT_CONCEPTS else ''}"
+            values = rng.lognormal(21, 0.5, size=len(filers))
+            payloads[f"/api/xbrl/frames/us-gaap/{concept}/USD/{frame}.json"] = json.dumps({
+                'taxonomy': 'us-gaap', 'tag': concept, 'ccp': frame, 'uom': 'USD', 'pts': len(filers),
+                'data': [
+                    {'accn': f"0000000000-00-{cik:06d}", 'cik': cik, 'entityName': f"Filer {cik}",
+                     'end': date.strftime('%Y-%m-%d'), 'val': float(value)}
+                    for cik, value in zip(filers, values)
+                ],
+            }).encode('utf-8')
+    return payloads
+
+
+def synthetic_frame_periods():
+    """
+    Frame labels of the quarters covered by ``synthetic_payloads``
+    """
+    dates = pd.date_range('2023-03-31', periods=8, freq='QE')
+    return [f"CY{date.year}Q{date.quarter}" for date in dates]
+
+
+def load_fixtures(fixtures_dir):
+    """
+    Recorded payloads from a directory tree mirroring the URL paths
+    """
+    payloads = {}
+    for root, _, files in os.walk(fixtures_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            url_path = '/' + os.path.relpath(path, fixtures_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                payloads[url_path] = f.read()
+    return payloads
+
+
+class ReplayServer:
+    """
+    Local HTTP stand-in that serves fixed payloads by URL path
+    """
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.requests = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = server.payloads.get(self.path.split('?')[0])
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', f'"{hash(body) & 0xffffffff:x}"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def replay_automator(base_url, workdir, companies):
+    """
+    FinancialDataAutomator whose sources all point at the replay server
+    """
+    automator = FinancialDataAutomator(
+        companies=companies,
+        cache_dir=os.path.join(workdir, 'cache'),
+        endpoints={'macrotrends': base_url, 'sec': base_url},
+    )
+
+    # yfinance talks to Yahoo directly, so replay its statements over HTTP
+    def yahoo_statements(symbol):
+        response = automator.session.get(f"{base_url}/yahoo/{symbol}.json")
+        payload = response.json()
+        return _payload_to_frame(payload['financials']), _payload_to_frame(payload['balance_sheet'])
+
+    automator._download_yahoo_statements = yahoo_statements
+    return automator
+
+
+def bench_ingestion(workdir, fixtures_dir=None, n_companies=None):
+    """
+    Time automated_data_collection and the SEC facts parser end to end
+    against the replay server, with a cold and a warm response cache, and
+    compare per-filer companyfacts with the cross-sectional frames mode
+    """
+    companies = dict(DEFAULT_COMPANIES)
+    if n_companies:
+        companies = {f"T{i:04d}": f"Ticker {i}" for i in range(n_companies)}
+    payloads = load_fixtures(fixtures_dir) if fixtures_dir else synthetic_payloads(companies)
+
+    results = []
+    with ReplayServer(payloads) as server:
+        automator = replay_automator(server.url, workdir, companies)
+        outputs = {
+            'output_file': os.path.join(workdir, 'automated_financial_data.csv'),
+            'long_output_file': os.path.join(workdir, 'processed_inventory_data.csv'),
+            'store_dir': os.path.join(workdir, 'ingest_store'),
+        }
+        for label in ('cold', 'warm'):
+            before = server.requests
+            seconds, _ = time_call(lambda: automator.automated_data_collection(incremental=False, **outputs), 1)
+            results.append({
+                'benchmark': f"automated_data_collection_{label}",
+                'tickers': len(companies),
+                'seconds': seconds,
+                'http_requests': server.requests - before,
+            })
+
+        before = server.requests
+        seconds, _ = time_call(lambda: [
+            automator.get_sec_edgar_facts(cik, symbol) for symbol, cik in DEFAULT_CIKS.items()
+        ], 1)
+        results.append({'benchmark': 'sec_companyfacts', 'filers': len(DEFAULT_CIKS), 'seconds': seconds,
+                        'http_requests': server.requests - before})
+
+        if not fixtures_dir:
+            before = server.requests
+            seconds, rows = time_call(lambda: automator.get_sec_frames(periods=synthetic_frame_periods()), 1)
+            results.append({'benchmark': 'sec_frames', 'filers': len(DEFAULT_CIKS), 'seconds': seconds,
+                            'rows': len(rows), 'http_requests': server.requests - before})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Synthetic dataset sizes in rows (up to 10000000)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions of the fast benchmarks")
+    parser.add_argument('--fixtures', help="Directory of recorded payloads to replay instead of synthetic ones")
+    parser.add_argument('--tickers', type=int, help="Number of synthetic tickers for the ingestion benchmark")
+    parser.add_argument('--skip-ingestion', action='store_true')
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('data_automation_script').setLevel(logging.WARNING)
+
+    report = {
+        'meta': {
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in args.sizes:
+            report['results'].extend(bench_dashboard(n_rows, workdir, repeat=args.repeat))
+        if not args.skip_ingestion:
+            report['results'].extend(bench_ingestion(workdir, args.fixtures, args.tickers))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
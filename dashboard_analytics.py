@@ -0,0 +1,338 @@
+"""
+Cross-company statistics behind the dashboard's focus analysis
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ['count', 'mean', 'median', 'std', 'min', 'max']
+
+
+def _pair_terms(rows):
+    """
+    Pairwise sufficient statistics of a block of Date x Company rows
+
+    Returns (N, Sx, Sxx, Sxy) where, for every pair of companies (i, j) and
+    over the rows where both have a value, N counts the rows, Sx and Sxx sum
+    x_i and x_i ** 2, and Sxy sums x_i * x_j. They are additive over rows,
+    so rows can be added or removed without revisiting the others.
+    """
+    valid = ~np.isnan(rows)
+    x = np.where(valid, rows, 0.0)
+    mask = valid.astype(np.float64)
+    return mask.T @ mask, x.T @ mask, (x * x).T @ mask, x.T @ x
+
+
+def _extremes(block):
+    """
+    Per-column min and max ignoring NaN (+inf / -inf for empty columns)
+    """
+    valid = ~np.isnan(block)
+    return (
+        np.min(block, axis=0, initial=np.inf, where=valid),
+        np.max(block, axis=0, initial=-np.inf, where=valid),
+    )
+
+
+def _correlation(n, sx, sxx, sxy):
+    """
+    Pearson correlation from pairwise sufficient statistics (NaN below two
+    overlapping observations or for constant series)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        numerator = n * sxy - sx * sx.T
+        variance = n * sxx - sx ** 2
+        denominator = np.sqrt(variance * variance.T)
+        corr = np.where((n >= 2) & (denominator > 0), numerator / denominator, np.nan)
+    return np.clip(corr, -1.0, 1.0)
+
+
+class MetricMatrix:
+    """
+    One metric as an aligned Date x Company matrix (NaN where a company has
+    no value for a period)
+
+    The pairwise sums needed for correlations and the per-company count,
+    sum, sum of squares, min and max over all rows are kept up to date as
+    rows are added, so full-history statistics never rescan the matrix and a
+    new quarter costs one O(companies ** 2) update.
+    """
+
+    def __init__(self, dates, companies, values):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.companies = list(companies)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.dates), len(self.companies))
+        self.positions = {company: i for i, company in enumerate(self.companies)}
+        self.terms = _pair_terms(self.values)
+        self.minimum, self.maximum = _extremes(self.values)
+        self._median = None
+
+    @classmethod
+    def from_rows(cls, rows, companies=None):
+        """
+        Build the matrix from long-format rows of a single metric
+        """
+        company_labels = rows['Company'].astype(str).to_numpy()
+        companies = list(companies) if companies is not None else list(pd.unique(company_labels))
+        company_index = pd.Index(companies).get_indexer(company_labels)
+        dates, date_index = np.unique(pd.to_datetime(rows['Date']).to_numpy(), return_inverse=True)
+        values = np.full((len(dates), len(companies)), np.nan)
+        keep = company_index >= 0
+        values[date_index[keep], company_index[keep]] = rows['Value'].to_numpy(dtype=np.float64)[keep]
+        return cls(dates, companies, values)
+
+    def _columns(self, companies):
+        if companies is None:
+            return np.arange(len(self.companies))
+        return np.array([self.positions[company] for company in companies if company in self.positions],
+                        dtype=np.intp)
+
+    def _rows(self, start, end):
+        lo = 0 if start is None else int(np.searchsorted(self.dates, pd.Timestamp(start).to_datetime64()))
+        hi = len(self.dates) if end is None else int(
+            np.searchsorted(self.dates, pd.Timestamp(end).to_datetime64(), side='right')
+        )
+        return lo, hi
+
+    def copy(self):
+        """
+        Independent copy that can be updated without affecting this matrix
+        """
+        matrix = MetricMatrix.__new__(MetricMatrix)
+        matrix.dates = self.dates.copy()
+        matrix.companies = list(self.companies)
+        matrix.values = self.values.copy()
+        matrix.positions = dict(self.positions)
+        matrix.terms = tuple(term.copy() for term in self.terms)
+        matrix.minimum, matrix.maximum = self.minimum.copy(), self.maximum.copy()
+        matrix._median = self._median
+        return matrix
+
+    def _add_company(self, company):
+        self.positions[company] = len(self.companies)
+        self.companies.append(company)
+        self.values = np.hstack([self.values, np.full((len(self.dates), 1), np.nan)])
+        self.terms = tuple(np.pad(term, ((0, 1), (0, 1))) for term in self.terms)
+        self.minimum = np.append(self.minimum, np.inf)
+        self.maximum = np.append(self.maximum, -np.inf)
+        self._median = None
+
+    def append(self, date, values):
+        """
+        Add or update the period ``date`` from a mapping of company -> value
+
+        Companies not seen before get a new column. Values for a period that
+        is already present replace the stored ones (companies missing from
+        ``values`` keep theirs). The running sums are adjusted with the old
+        and new row only.
+        """
+        values = pd.Series(values, dtype=np.float64).dropna()
+        for company in values.index:
+            if company not in self.positions:
+                self._add_company(company)
+
+        date = pd.Timestamp(date).to_datetime64().astype('datetime64[ns]')
+        row = np.full(len(self.companies), np.nan)
+        row[self._columns(values.index)] = values.to_numpy()
+
+        at = int(np.searchsorted(self.dates, date))
+        if at < len(self.dates) and self.dates[at] == date:
+            old = self.values[at].copy()
+            row = np.where(np.isnan(row), old, row)
+            self.terms = tuple(
+                total - removed + added
+                for total, removed, added in zip(self.terms, _pair_terms(old[None]), _pair_terms(row[None]))
+            )
+            self.values[at] = row
+            if np.any(row < old) or np.any(row > old):
+                # A restated value may have been the extreme; rescan
+                self.minimum, self.maximum = _extremes(self.values)
+        else:
+            self.dates = np.insert(self.dates, at, date)
+            self.values = np.insert(self.values, at, row, axis=0)
+            self.terms = tuple(total + added for total, added in zip(self.terms, _pair_terms(row[None])))
+        # New values (including ones filling a gap of an existing period)
+        self.minimum = np.fmin(self.minimum, np.where(np.isnan(row), np.inf, row))
+        self.maximum = np.fmax(self.maximum, np.where(np.isnan(row), -np.inf, row))
+        self._median = None
+
+    def clear(self, companies):
+        """
+        Remove every value of ``companies`` (e.g. before their rows are
+        appended again); periods left without any value are dropped
+        """
+        columns = self._columns(companies)
+        at = np.flatnonzero(~np.isnan(self.values[:, columns]).all(axis=1))
+        if not len(at):
+            return
+        old = self.values[at]
+        rows = old.copy()
+        rows[:, columns] = np.nan
+        self.terms = tuple(
+            total - removed + added
+            for total, removed, added in zip(self.terms, _pair_terms(old), _pair_terms(rows))
+        )
+        self.values[at] = rows
+        keep = ~np.isnan(self.values).all(axis=1)
+        self.dates, self.values = self.dates[keep], self.values[keep]
+        self.minimum, self.maximum = _extremes(self.values)
+        self._median = None
+
+    def correlation(self, companies=None, start=None, end=None):
+        """
+        Pairwise-complete Pearson correlation between companies
+
+        Over the full history the maintained sums are just indexed; a date
+        range recomputes them for its rows with a few matrix products.
+        """
+        columns = self._columns(companies)
+        lo, hi = self._rows(start, end)
+        if lo == 0 and hi == len(self.dates):
+            terms = tuple(term[np.ix_(columns, columns)] for term in self.terms)
+        else:
+            terms = _pair_terms(self.values[lo:hi][:, columns])
+        labels = [self.companies[i] for i in columns]
+        return pd.DataFrame(_correlation(*terms), index=labels, columns=labels)
+
+    def rolling_correlation(self, window, companies=None, start=None, end=None):
+        """
+        Correlation matrices over a sliding window of ``window`` periods
+
+        Returns ``(dates, matrices)`` where ``matrices[k]`` covers the
+        ``window`` periods ending at ``dates[k]``. The window's sums are
+        slid by adding the entering row and subtracting the leaving one.
+        """
+        columns = self._columns(companies)
+        lo, hi = self._rows(start, end)
+        rows = self.values[lo:hi][:, columns]
+        if window < 2 or len(rows) < window:
+            return self.dates[:0], np.empty((0, len(columns), len(columns)))
+
+        terms = list(_pair_terms(rows[:window]))
+        matrices = [_correlation(*terms)]
+        for k in range(window, len(rows)):
+            entering, leaving = _pair_terms(rows[k][None]), _pair_terms(rows[k - window][None])
+            terms = [total + added - removed for total, added, removed in zip(terms, entering, leaving)]
+            matrices.append(_correlation(*terms))
+        return self.dates[lo:hi][window - 1:], np.stack(matrices)
+
+    def summary(self, companies=None, start=None, end=None):
+        """
+        Count, mean, median, standard deviation, min and max per company
+        """
+        columns = self._columns(companies)
+        lo, hi = self._rows(start, end)
+        labels = [self.companies[i] for i in columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if lo == 0 and hi == len(self.dates):
+                n, sx, sxx, _ = (np.diagonal(term)[columns] for term in self.terms)
+                if self._median is None:
+                    self._median = self._nanmedian(self.values)
+                median = self._median[columns]
+                minimum = np.where(n > 0, self.minimum[columns], np.nan)
+                maximum = np.where(n > 0, self.maximum[columns], np.nan)
+            else:
+                block = self.values[lo:hi][:, columns]
+                valid = ~np.isnan(block)
+                n = valid.sum(axis=0).astype(np.float64)
+                x = np.where(valid, block, 0.0)
+                sx, sxx = x.sum(axis=0), (x * x).sum(axis=0)
+                median = self._nanmedian(block)
+                minimum, maximum = _extremes(block)
+                minimum = np.where(n > 0, minimum, np.nan)
+                maximum = np.where(n > 0, maximum, np.nan)
+            mean = np.where(n > 0, sx / n, np.nan)
+            variance = np.where(n > 1, (sxx - n * mean ** 2) / (n - 1), np.nan)
+        return pd.DataFrame({
+            'count': n.astype(np.int64),
+            'mean': mean,
+            'median': median,
+            'std': np.sqrt(np.maximum(variance, 0)),
+            'min': minimum,
+            'max': maximum,
+        }, index=pd.Index(labels, name='Company'))[SUMMARY_COLUMNS]
+
+    @staticmethod
+    def _nanmedian(block):
+        if not block.size:
+            return np.full(block.shape[1], np.nan)
+        all_missing = np.isnan(block).all(axis=0)
+        median = np.full(block.shape[1], np.nan)
+        if not all_missing.all():
+            median[~all_missing] = np.nanmedian(block[:, ~all_missing], axis=0)
+        return median
+
+
+class AnalyticsEngine:
+    """
+    Lazily built MetricMatrix per metric of an IndexedDataset
+
+    Matrices are built the first time a metric is analysed and then kept;
+    ``update`` folds newly ingested rows into the built ones and
+    ``replace_partitions`` derives the engine of a newly published version
+    from them. Safe to share between sessions.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.matrices = {}
+        self.lock = threading.Lock()
+
+    def matrix(self, metric):
+        with self.lock:
+            if metric not in self.matrices:
+                rows = self.dataset.select(metric)
+                self.matrices[metric] = MetricMatrix.from_rows(rows, companies=self.dataset.companies)
+            return self.matrices[metric]
+
+    def update(self, rows):
+        """
+        Fold new long-format rows (e.g. a freshly ingested quarter) into the
+        matrices, one O(companies ** 2) update per (metric, period)
+        """
+        for (metric, date), period in rows.groupby(['Metric', 'Date'], observed=True, sort=True):
+            matrix = self.matrix(metric)
+            with self.lock:
+                matrix.append(date, dict(zip(period['Company'].astype(str), period['Value'])))
+
+    def replace_partitions(self, dataset, rows, partitions):
+        """
+        New engine for ``dataset``, this engine's dataset with the (Company,
+        Metric) ``partitions`` replaced by ``rows`` (see
+        ``IndexedDataset.replace_partitions``)
+
+        Built matrices of unchanged metrics are shared; the others are
+        copied, the changed companies cleared and their new rows folded in
+        with ``update``. Every matrix gets a column for each company of
+        ``dataset``, as a freshly built one would. This instance is left
+        untouched, so sessions still holding it keep a consistent view.
+        """
+        changed = {}
+        for company, metric in partitions:
+            changed.setdefault(metric, []).append(company)
+        with self.lock:
+            matrices = dict(self.matrices)
+
+        engine = AnalyticsEngine(dataset)
+        for metric, matrix in matrices.items():
+            missing = [company for company in dataset.companies if company not in matrix.positions]
+            if metric in changed or missing:
+                matrix = matrix.copy()
+                matrix.clear(changed.get(metric, []))
+                for company in missing:
+                    matrix._add_company(company)
+            engine.matrices[metric] = matrix
+        # Metrics not built yet are built from ``dataset`` on first use
+        engine.update(rows[rows['Metric'].astype(str).isin(list(matrices))])
+        return engine
+
+    def correlation(self, metric, companies=None, start=None, end=None):
+        return self.matrix(metric).correlation(companies, start, end)
+
+    def rolling_correlation(self, metric, window, companies=None, start=None, end=None):
+        return self.matrix(metric).rolling_correlation(window, companies, start, end)
+
+    def summary(self, metric, companies=None, start=None, end=None):
+        return self.matrix(metric).summary(companies, start, end)
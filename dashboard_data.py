@@ -0,0 +1,291 @@
+"""
+In-memory data structures behind the Streamlit dashboard
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_store import LONG_COLUMNS, atomic_write, normalize_long
+
+
+class SearchIndex:
+    """
+    Case-insensitive substring index over the displayed fields of a dataset
+
+    Each field is dictionary-encoded: the distinct values are lowercased once
+    and every row only stores an integer code. A query is matched against the
+    distinct values through a trigram index (so only candidate values are
+    scanned) and the matching codes are mapped back to row positions through
+    precomputed posting lists.
+    """
+
+    def __init__(self, frame):
+        self.n_rows = len(frame)
+        self.fields = []
+        for column in ('Company', 'Metric', 'Date', 'Value'):
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            # Series.astype(str) prints float32 values in their shortest form
+            # (3380.34, not the widened 3380.340087890625 an Index gives)
+            labels = pd.Series(uniques).astype(str).str.lower().to_numpy(dtype=object)
+            self.fields.append(self._build_field(codes, labels))
+
+    @staticmethod
+    def _build_field(codes, labels):
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = codes >= 0
+        order = np.flatnonzero(valid)[np.argsort(codes[valid], kind='stable')]
+        offsets = np.r_[0, np.cumsum(np.bincount(codes[valid], minlength=len(labels)))]
+
+        # Trigrams of every distinct label, as sorted (trigram, label id) pairs
+        encoded = np.array([label.encode('utf-8') for label in labels], dtype=bytes)
+        width = encoded.dtype.itemsize
+        if len(labels) and width >= 3:
+            raw = encoded.view(np.uint8).reshape(len(labels), width).astype(np.int32)
+            grams = (raw[:, :-2] << 16) | (raw[:, 1:-1] << 8) | raw[:, 2:]
+            present = (raw[:, :-2] > 0) & (raw[:, 1:-1] > 0) & (raw[:, 2:] > 0)
+            label_ids = np.broadcast_to(np.arange(len(labels), dtype=np.int64)[:, None], grams.shape)
+            pairs = np.sort((grams[present].astype(np.int64) << 32) | label_ids[present])
+            pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+            gram_keys, gram_labels = pairs >> 32, pairs & 0xFFFFFFFF
+        else:
+            gram_keys = gram_labels = np.empty(0, dtype=np.int64)
+
+        return {
+            'labels': labels,
+            'order': order,
+            'offsets': offsets,
+            'gram_keys': gram_keys,
+            'gram_labels': gram_labels,
+        }
+
+    @staticmethod
+    def _matching_labels(field, needle):
+        labels = field['labels']
+        raw = needle.encode('utf-8')
+        if len(raw) < 3:
+            candidates = np.arange(len(labels))
+        else:
+            candidates = None
+            for i in range(len(raw) - 2):
+                gram = (raw[i] << 16) | (raw[i + 1] << 8) | raw[i + 2]
+                lo, hi = np.searchsorted(field['gram_keys'], [gram, gram + 1])
+                ids = field['gram_labels'][lo:hi]
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    return candidates
+        return np.array([i for i in candidates if needle in labels[i]], dtype=np.int64)
+
+    def search(self, term):
+        """
+        Sorted row positions whose Company, Metric, Date or Value contains ``term``
+        """
+        needle = term.lower()
+        hits = []
+        for field in self.fields:
+            for label_id in self._matching_labels(field, needle):
+                hits.append(field['order'][field['offsets'][label_id]:field['offsets'][label_id + 1]])
+        if not hits:
+            return np.empty(0, dtype=np.intp)
+        if sum(len(positions) for positions in hits) * 16 < self.n_rows:
+            return np.unique(np.concatenate(hits))
+        # Broad matches: marking a row mask is cheaper than sorting the hits
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for positions in hits:
+            mask[positions] = True
+        return np.flatnonzero(mask)
+
+
+class IndexedDataset:
+    """
+    Long-format dataset pre-sorted by (Metric, Company, Date)
+
+    Every (Metric, Company) pair occupies one contiguous block of rows with
+    ascending dates, so company, metric and date filters resolve to a few
+    binary searches and slices instead of boolean masks over the whole table.
+    Rows are held in the canonical schema of ``normalize_long``: Company and
+    Metric as categorical codes, datetime64 dates and float32 values where
+    precision allows.
+
+    The dataset is read-only once built, so one instance can be shared by
+    every dashboard session: ``positions``, ``summarize`` and ``aggregate``
+    answer filter/aggregate queries from the shared arrays without copying
+    rows, and only ``select`` / ``take`` materialize a frame.
+    """
+
+    def __init__(self, df, normalized=False):
+        # Rows already in the canonical schema (e.g. from read_store) are
+        # not validated again
+        frame = df if normalized else normalize_long(df)
+        frame = frame.sort_values(['Metric', 'Company', 'Date'], kind='stable', ignore_index=True)
+        self._index(frame[LONG_COLUMNS])
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """
+        Load a dataset written by ``write_snapshot``
+
+        The Arrow file is memory-mapped, so its pages are shared through the
+        OS page cache by every process that opens it, and the already sorted
+        rows are indexed without another sort.
+        """
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        dataset = cls.__new__(cls)
+        dataset._index(table.to_pandas(split_blocks=True))
+        return dataset
+
+    def write_snapshot(self, path):
+        """
+        Atomically write the sorted rows to an uncompressed Arrow IPC file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pandas(self.frame, preserve_index=False)
+        with atomic_write(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def replace_partitions(self, rows, partitions):
+        """
+        New dataset with the (Company, Metric) ``partitions`` replaced by
+        ``rows`` (e.g. the changed partitions of a newly published store)
+
+        The rows of every other partition are reused as they are; this
+        instance is left untouched, so sessions still holding it keep a
+        consistent view.
+        """
+        keep = np.ones(len(self.frame), dtype=bool)
+        for company, metric in partitions:
+            block = self.blocks.get((metric, company))
+            if block is not None:
+                keep[block[0]:block[1]] = False
+        return IndexedDataset(pd.concat([self.frame[keep], rows[LONG_COLUMNS]], ignore_index=True))
+
+    def _index(self, frame):
+        metrics = list(frame['Metric'].cat.categories)
+        companies = list(frame['Company'].cat.categories)
+
+        self.frame = frame
+        self.companies = companies
+        self.metrics = metrics
+        self.dates = frame['Date'].to_numpy()
+        self.values = frame['Value'].to_numpy()
+        for array in (self.dates, self.values):
+            array.flags.writeable = False
+
+        metric_codes = frame['Metric'].cat.codes.to_numpy()
+        company_codes = frame['Company'].cat.codes.to_numpy()
+        breaks = np.flatnonzero((np.diff(metric_codes) != 0) | (np.diff(company_codes) != 0)) + 1
+        starts = np.r_[0, breaks] if len(frame) else np.empty(0, dtype=np.intp)
+        stops = np.r_[breaks, len(frame)] if len(frame) else np.empty(0, dtype=np.intp)
+        self.blocks = {
+            (metrics[metric_codes[start]], companies[company_codes[start]]): (int(start), int(stop))
+            for start, stop in zip(starts, stops)
+        }
+        self.search_index = SearchIndex(self.frame)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _ranges(self, metrics=None, companies=None, start=None, end=None):
+        if metrics is None:
+            metrics = self.metrics
+        elif isinstance(metrics, str):
+            metrics = [metrics]
+        if companies is None:
+            companies = self.companies
+        elif isinstance(companies, str):
+            companies = [companies]
+        start = None if start is None else pd.Timestamp(start).to_datetime64()
+        end = None if end is None else pd.Timestamp(end).to_datetime64()
+
+        for metric in dict.fromkeys(metrics):
+            for company in dict.fromkeys(companies):
+                block = self.blocks.get((metric, company))
+                if block is None:
+                    continue
+                first, stop = block
+                dates = self.dates[first:stop]
+                lo = first + int(np.searchsorted(dates, start, side='left')) if start is not None else first
+                hi = first + int(np.searchsorted(dates, end, side='right')) if end is not None else stop
+                if lo < hi:
+                    yield lo, hi
+
+    def positions(self, metrics=None, companies=None, start=None, end=None):
+        """
+        Row positions matching the given metric(s), companies and inclusive date range
+        """
+        ranges = [np.arange(lo, hi) for lo, hi in self._ranges(metrics, companies, start, end)]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.intp)
+
+    def select(self, metrics=None, companies=None, start=None, end=None):
+        """
+        Long-format rows matching the given metric(s), companies and inclusive date range
+        """
+        return self.take(self.positions(metrics, companies, start, end))
+
+    def take(self, positions):
+        """
+        Rows at the given positions (e.g. from ``positions``) as a new frame
+        """
+        return self.frame.iloc[positions]
+
+    def summarize(self, metrics=None, companies=None, start=None, end=None):
+        """
+        Count, sum, mean, min and max of the matching values, computed on the
+        shared value array without materializing the rows
+        """
+        ranges = list(self._ranges(metrics, companies, start, end))
+        chunks = [self.values[lo:hi] for lo, hi in ranges]
+        values = np.concatenate(chunks) if chunks else self.values[:0]
+        values = values[~np.isnan(values)]
+        count = len(values)
+        total = float(values.sum(dtype=np.float64)) if count else 0.0
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else np.nan,
+            'min': float(values.min()) if count else np.nan,
+            'max': float(values.max()) if count else np.nan,
+        }
+
+    def aggregate(self, metric, companies=None, start=None, end=None):
+        """
+        Per-company count, mean, min and max of one metric, one reduction per
+        contiguous block
+        """
+        if companies is None:
+            companies = self.companies
+        rows = []
+        for company in dict.fromkeys(companies):
+            stats = self.summarize(metric, company, start, end)
+            if stats['count']:
+                rows.append({'Company': company, **stats})
+        return pd.DataFrame(rows, columns=['Company', 'count', 'sum', 'mean', 'min', 'max'])
+
+    def search(self, term, positions=None):
+        """
+        Rows containing ``term`` in any column, optionally restricted to the
+        given row positions (e.g. the currently filtered rows)
+        """
+        matches = self.search_index.search(term)
+        if positions is not None:
+            matches = np.intersect1d(matches, positions)
+        return self.take(matches)
+
+    def date_bounds(self, companies=None):
+        """
+        Earliest and latest date stored for the given companies
+        """
+        blocks = list(self._ranges(companies=companies))
+        if not blocks:
+            return pd.NaT, pd.NaT
+        return (
+            pd.Timestamp(min(self.dates[lo] for lo, _ in blocks)),
+            pd.Timestamp(max(self.dates[hi - 1] for _, hi in blocks)),
+        )
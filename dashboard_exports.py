@@ -0,0 +1,173 @@
+"""
+On-demand file exports of the dashboard's filtered data
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+from data_store import LONG_COLUMNS, atomic_write
+
+# Format label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Rows (long layout) or companies (wide layout) materialized per chunk
+CHUNK_ROWS = 100_000
+CHUNK_COMPANIES = 50
+
+# Excel caps a worksheet at 1,048,576 rows (one is the header)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Exports kept on disk; older ones are removed when a new one is written
+MAX_CACHED_EXPORTS = 20
+
+
+def _long_chunks(dataset, companies, start, end):
+    positions = dataset.positions(None, companies, start, end)
+    for offset in range(0, len(positions), CHUNK_ROWS):
+        yield dataset.take(positions[offset:offset + CHUNK_ROWS])
+
+
+def _wide_metrics(dataset, companies):
+    # Every chunk gets the same columns: the metrics any selected company has
+    return [
+        metric for metric in dataset.metrics
+        if any((metric, company) in dataset.blocks for company in companies)
+    ]
+
+
+def _wide_chunks(dataset, companies, start, end):
+    metrics = _wide_metrics(dataset, companies)
+    for offset in range(0, len(companies), CHUNK_COMPANIES):
+        rows = dataset.select(None, companies[offset:offset + CHUNK_COMPANIES], start, end)
+        if rows.empty:
+            continue
+        wide = rows.pivot_table(
+            index=['Company', 'Date'], columns='Metric', values='Value', aggfunc='last', observed=True
+        )
+        wide = wide.reindex(columns=metrics).reset_index()
+        wide.columns.name = None
+        wide['Company'] = wide['Company'].astype(str)
+        yield wide
+
+
+def _write_csv(chunks, f, columns):
+    # The header is written up front so an empty selection still has one
+    pd.DataFrame(columns=columns).to_csv(f, index=False)
+    for chunk in chunks:
+        chunk.to_csv(f, index=False, header=False, date_format='%Y-%m-%d')
+
+
+def _write_parquet(chunks, f, columns):
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(
+            chunk.astype({'Company': str, **({'Metric': str} if 'Metric' in chunk else {})}),
+            preserve_index=False,
+        )
+        if writer is None:
+            writer = pq.ParquetWriter(f, table.schema)
+        writer.write_table(table)
+    if writer is None:
+        schema = pa.schema([
+            (column, pa.string() if column in ('Company', 'Metric') else
+             pa.timestamp('ns') if column == 'Date' else pa.float64())
+            for column in columns
+        ])
+        pq.write_table(schema.empty_table(), f)
+    else:
+        writer.close()
+
+
+def _write_excel(chunks, f, columns):
+    # constant_memory streams every finished row to disk instead of keeping
+    # the whole sheet in memory
+    workbook = xlsxwriter.Workbook(f, {'constant_memory': True, 'nan_inf_to_errors': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    worksheet, row = None, EXCEL_MAX_ROWS
+    for chunk in chunks:
+        # Excel stores doubles; widen float32 through its shortest decimal
+        # form so 0.7899 is not written as 0.789900004863739
+        narrow = [column for column, dtype in chunk.dtypes.items() if dtype == np.float32]
+        chunk = chunk.astype({column: str for column in narrow}).astype({column: np.float64 for column in narrow})
+        columns = list(chunk.columns)
+        date_column = columns.index('Date')
+        for values in chunk.itertuples(index=False, name=None):
+            if row >= EXCEL_MAX_ROWS:
+                worksheet = workbook.add_worksheet(f"Data {len(workbook.worksheets()) + 1}")
+                worksheet.write_row(0, 0, columns)
+                worksheet.set_column(date_column, date_column, 12, date_format)
+                row = 0
+            row += 1
+            worksheet.write_row(row, 0, ['' if pd.isna(value) else value for value in values])
+    if worksheet is None:
+        workbook.add_worksheet('Data 1').write_row(0, 0, columns)
+    workbook.close()
+
+
+WRITERS = {
+    'CSV': _write_csv,
+    'Parquet': _write_parquet,
+    'Excel': _write_excel,
+}
+
+
+def export_path(cache_dir, version, fmt, wide, companies, start, end):
+    """
+    Cache file of one export, named after the data version and filter state
+    """
+    key = repr((version, fmt, bool(wide), tuple(companies), str(start), str(end)))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"export_{digest}.{EXPORT_FORMATS[fmt][0]}")
+
+
+def export_file(dataset, fmt, companies, start=None, end=None, wide=False, cache_dir=None, version=None):
+    """
+    Write the filtered rows of ``dataset`` in the given format and return
+    the file path
+
+    Rows are materialized and written one chunk at a time into a temporary
+    file that is renamed into place, so peak memory stays around one chunk.
+    The same data version and filter state reuse the existing file.
+    """
+    cache_dir = cache_dir or tempfile.gettempdir()
+    os.makedirs(cache_dir, exist_ok=True)
+    companies = list(companies)
+    path = export_path(cache_dir, version, fmt, wide, companies, start, end)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    if wide:
+        chunks = _wide_chunks(dataset, companies, start, end)
+        columns = ['Company', 'Date', *_wide_metrics(dataset, companies)]
+    else:
+        chunks = _long_chunks(dataset, companies, start, end)
+        columns = LONG_COLUMNS
+    with atomic_write(path, 'w' if fmt == 'CSV' else 'wb', **({'newline': ''} if fmt == 'CSV' else {})) as f:
+        WRITERS[fmt](chunks, f, columns)
+    _prune(cache_dir)
+    return path
+
+
+def _prune(cache_dir):
+    exports = sorted(
+        (os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.startswith('export_')),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for path in exports[MAX_CACHED_EXPORTS:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,228 @@
+"""
+Plotly figure builders for the Streamlit dashboard
+
+Each builder takes the long-format rows of one selection and the metric it
+was selected for, and returns a figure. They hold no Streamlit state so the
+dashboard can memoize them and the benchmarks can time them directly.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Upper bound on points sent to the browser by one time-series chart
+MAX_CHART_POINTS = 4000
+
+# Charts with more points than this are drawn with WebGL and without markers
+WEBGL_POINT_THRESHOLD = 1000
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Returns the indices of ``n_out`` points of the (sorted) series ``x, y``
+    that best preserve its visual shape. The first and last points are
+    always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def level_of_detail(df, max_points=MAX_CHART_POINTS):
+    """
+    Downsample each company's series with LTTB so the whole chart stays
+    within ``max_points``
+
+    The budget is spread over the visible rows, so narrowing the date range
+    brings back full detail for the zoomed-in period.
+    """
+    if len(df) <= max_points:
+        return df
+    n_series = max(df["Company"].nunique(), 1)
+    per_series = max(max_points // n_series, 3)
+    parts = []
+    for _, series in df.groupby("Company", observed=True, sort=False):
+        series = series.dropna(subset=["Value"]).sort_values("Date")
+        x = series["Date"].to_numpy().astype("int64").astype("float64")
+        y = series["Value"].to_numpy(dtype="float64")
+        parts.append(series.iloc[lttb(x, y, per_series)])
+    return pd.concat(parts) if parts else df.iloc[:0]
+
+
+def use_webgl(df):
+    return len(df) > WEBGL_POINT_THRESHOLD
+
+
+def revenue_trend(df, metric):
+    df = level_of_detail(df)
+    webgl = use_webgl(df)
+    fig = px.line(
+        df,
+        x="Date",
+        y="Value",
+        color="Company",
+        title="Revenue Over Time (in USD)",
+        markers=not webgl,
+        render_mode="webgl" if webgl else "svg"
+    )
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Revenue (USD)",
+        hovermode='x unified'
+    )
+    return fig
+
+
+def inventory_trend(df, metric):
+    df = level_of_detail(df)
+    webgl = use_webgl(df)
+    fig = px.line(
+        df,
+        x="Date",
+        y="Value",
+        color="Company",
+        title="Inventory Over Time (in USD)",
+        markers=not webgl,
+        render_mode="webgl" if webgl else "svg"
+    )
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Inventory (USD)",
+        hovermode='x unified'
+    )
+    return fig
+
+
+def average_by_company(df, metric):
+    avg_by_company = df.groupby("Company", observed=True)["Value"].mean().reset_index()
+    fig = px.bar(
+        avg_by_company,
+        x="Company",
+        y="Value",
+        title=f"Average {metric} by Company",
+        color="Company"
+    )
+    fig.update_layout(
+        xaxis_title="Company",
+        yaxis_title=f"{metric} (USD)"
+    )
+    return fig
+
+
+def distribution_by_company(df, metric):
+    fig = px.box(
+        df,
+        x="Company",
+        y="Value",
+        title=f"{metric} Distribution by Company"
+    )
+    fig.update_layout(
+        xaxis_title="Company",
+        yaxis_title=f"{metric} (USD)"
+    )
+    return fig
+
+
+def cogs_vs_gross_profit(df, metric):
+    fig = px.bar(
+        df,
+        x="Date",
+        y="Value",
+        color="Metric",
+        facet_col="Company",
+        title="Cost of Goods Sold vs Gross Profit",
+        barmode="group"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def cash_trend(df, metric):
+    df = level_of_detail(df)
+    webgl = use_webgl(df)
+    fig = px.line(
+        df,
+        x="Date",
+        y="Value",
+        color="Company",
+        title="Cash On Hand Over Time",
+        markers=not webgl,
+        render_mode="webgl" if webgl else "svg"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def turnover_scatter(df, metric):
+    df = level_of_detail(df)
+    webgl = use_webgl(df)
+    fig = px.scatter(
+        df,
+        x="Date",
+        y="Value",
+        color="Company",
+        size="Value",
+        title="Inventory Turnover Ratio Over Time",
+        hover_data=["Company", "Date", "Value"],
+        render_mode="webgl" if webgl else "svg"
+    )
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Inventory Turnover Ratio"
+    )
+    return fig
+
+
+def qoq_growth(df, metric):
+    fig = px.bar(
+        df,
+        x="Date",
+        y="Value",
+        color="Company",
+        title=f"{metric.removesuffix(' QoQ Growth')} Quarter-over-Quarter Growth Rate (%)",
+        barmode="group"
+    )
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Growth Rate (%)"
+    )
+    return fig
+
+
+FIGURE_BUILDERS = {
+    "revenue_trend": revenue_trend,
+    "inventory_trend": inventory_trend,
+    "average_by_company": average_by_company,
+    "distribution_by_company": distribution_by_company,
+    "cogs_vs_gross_profit": cogs_vs_gross_profit,
+    "cash_trend": cash_trend,
+    "turnover_scatter": turnover_scatter,
+    "qoq_growth": qoq_growth,
+}
+
+
+def build_figure(name, df, metric):
+    """
+    Build the named figure from the rows of one selection
+    """
+    return FIGURE_BUILDERS[name](df, metric)
@@ -3,35 +3,566 @@ Data Automation Script for Semiconductor Company Financial Data
 This script demonstrates various automation approaches for gathering competitor data.
 """
 
-import requests
+import argparse
+import heapq
+import io
+import random
+import signal
+import threading
+import numpy as np
 import pandas as pd
 import time
-from bs4 import BeautifulSoup
 import json
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import yfinance as yf
+import ijson
 import logging
+import os
+from urllib.parse import urlparse
+
+from data_store import (
+    atomic_write_csv,
+    latest_dates,
+    newer_than_stored,
+    ratio_metric,
+    read_csv_if_exists,
+    refresh_store,
+    to_long_format,
+    to_wide_format,
+    upsert_long_csv,
+    upsert_wide_csv,
+    DEFAULT_STORE_DIR,
+    KEY_COLUMNS,
+    LONG_COLUMNS,
+)
+from http_utils import CachedResponse, CircuitOpenError, HttpTransport, ResponseCache, TokenBucket
+from instrumentation import MetricsRecorder
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Requests per second allowed against each upstream host
+DEFAULT_RATE_LIMITS = {
+    'query2.finance.yahoo.com': 2.0,
+    'www.macrotrends.net': 0.5,
+    'data.sec.gov': 10.0,
+}
+
+# Yahoo Finance statement line items and the metric names they map to
+YAHOO_INCOME_ITEMS = {
+    'Total Revenue': 'Revenue',
+    'Cost Of Revenue': 'Cost Of Goods Sold',
+    'Gross Profit': 'Gross Profit',
+}
+YAHOO_BALANCE_ITEMS = {
+    'Inventory': 'Inventory',
+    'Cash And Cash Equivalents': 'Cash On Hand',
+}
+YAHOO_COLUMNS = [
+    'Company', 'Date', 'Revenue', 'Cost Of Goods Sold', 'Gross Profit',
+    'Inventory', 'Cash On Hand', 'Inventory Turnover',
+]
+
+DEFAULT_COMPANIES = {
+    'WDC': 'Western Digital Corporation',
+    'MU': 'Micron Technology Inc.',
+    'TSM': 'Taiwan Semiconductor Manufacturing Company Limited',
+    'INTC': 'Intel Corporation'
+}
+
+# SEC EDGAR central index keys of the tracked companies
+DEFAULT_CIKS = {
+    'WDC': 106040,
+    'MU': 723125,
+    'TSM': 1046179,
+    'INTC': 50863,
+}
+
+SEC_HEADERS = {
+    'User-Agent': 'YourCompany your.email@company.com',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+# XBRL concepts mapped to dashboard metrics; when several concepts map to
+# the same metric, the first one listed wins
+SEC_CONCEPTS = {
+    'Revenues': 'Revenue',
+    'RevenueFromContractWithCustomerExcludingAssessedTax': 'Revenue',
+    'CostOfRevenue': 'Cost Of Goods Sold',
+    'CostOfGoodsAndServicesSold': 'Cost Of Goods Sold',
+    'GrossProfit': 'Gross Profit',
+    'InventoryNet': 'Inventory',
+    'CashAndCashEquivalentsAtCarryingValue': 'Cash On Hand',
+}
+SEC_UNITS = ('USD',)
+
+# SEC frame labels of single quarters: CY2024Q3 (duration) or CY2024Q3I (instant)
+QUARTERLY_FRAME = re.compile(r'^CY\d{4}Q[1-4]I?$')
+
+# Concepts reported at a point in time (balance sheet items); their frames
+# are requested with the instant suffix (CY2024Q3I)
+SEC_INSTANT_CONCEPTS = ('InventoryNet', 'CashAndCashEquivalentsAtCarryingValue')
+
+# Calendar quarters requested by the frames bulk mode when none are given
+SEC_FRAME_QUARTERS = 8
+
+# SEC facts carry the filer's exact period end, which for 52/53-week fiscal
+# years is a weekday near the month end; ends this many days into a month
+# belong to the previous month
+PERIOD_END_GRACE_DAYS = 7
+
+# Names used for tickers in the dashboard's long-format dataset
+COMPANY_DISPLAY_NAMES = {
+    'MU': 'Micron',
+    'TSM': 'TSMC',
+    'INTC': 'Intel',
+}
+
+# A ticker whose latest stored quarter is younger than this cannot have
+# filed a newer one yet, so incremental runs do not request it
+QUARTER_REFRESH_DAYS = 85
+
+# Macrotrends statement pages and the line items (named as in the dashboard)
+# taken from each; values on these pages are already in millions of USD
+MACROTRENDS_STATEMENTS = {
+    'income-statement': ('Revenue', 'Cost Of Goods Sold', 'Gross Profit'),
+    'balance-sheet': ('Inventory', 'Cash On Hand'),
+}
+
+# URL slugs of the Macrotrends company pages. Macrotrends redirects any slug
+# to the canonical one, so tickers missing here fall back to the symbol
+MACROTRENDS_SLUGS = {
+    'WDC': 'western-digital',
+    'MU': 'micron-technology',
+    'TSM': 'taiwan-semiconductor-manufacturing',
+    'INTC': 'intel',
+}
+
+# Start of the chart data array embedded in Macrotrends statement pages
+MACROTRENDS_DATA = re.compile(rb'var\s+originalData\s*=\s*')
+HTML_TAG = re.compile(r'<[^>]+>')
+
+# Base URLs of the HTTP sources; overridable to point at mirrors or local stand-ins
+DEFAULT_ENDPOINTS = {
+    'macrotrends': 'https://www.macrotrends.net',
+    'sec': 'https://data.sec.gov',
+}
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'http')
+DEFAULT_OUTPUT_FILE = os.path.join(BASE_DIR, 'automated_financial_data.csv')
+DEFAULT_LONG_OUTPUT_FILE = os.path.join(BASE_DIR, 'processed_inventory_data.csv')
+
+# Seconds a cached response stays fresh before it is revalidated
+DEFAULT_CACHE_TTLS = {
+    'yahoo': 12 * 3600,
+    'macrotrends': 24 * 3600,
+    'sec': 24 * 3600,
+}
+
+# Sources fetched by a collection run, in order of precedence when several
+# report the same (Company, Metric, Date); SEC companyfacts are opt-in
+COLLECT_SOURCES = ('macrotrends', 'yahoo')
+SOURCES = ('macrotrends', 'yahoo', 'sec')
+
+# Source that reported each published (Company, Metric, Date), kept next to
+# the wide output so a source of higher precedence can restate a quarter a
+# lower one published first
+SOURCE_COLUMNS = [*KEY_COLUMNS, 'Source']
+
+# Seconds between scheduled refreshes of each source. Every wait is
+# stretched or shrunk by up to SCHEDULE_JITTER of the interval, and first
+# runs are delayed by up to that fraction, so sources (and several daemons)
+# do not hit their hosts in lockstep. Only COLLECT_SOURCES are scheduled
+# unless others are requested.
+DEFAULT_SCHEDULE = {
+    'sec': 15 * 60,
+    'yahoo': 3600,
+    'macrotrends': 6 * 3600,
+}
+SCHEDULE_JITTER = 0.1
+
+
+def _frame_to_payload(frame):
+    """
+    Serialize a yfinance statement frame (line items x period dates) to JSON-safe lists
+    """
+    return {
+        'index': [str(label) for label in frame.index],
+        'columns': [pd.Timestamp(column).isoformat() for column in frame.columns],
+        'data': frame.astype(float).values.tolist(),
+    }
+
+
+def _payload_to_frame(payload):
+    return pd.DataFrame(
+        payload['data'],
+        index=payload['index'],
+        columns=pd.to_datetime(payload['columns']),
+    )
+
+def iter_companyfacts(stream, concepts=SEC_CONCEPTS, units=SEC_UNITS, taxonomy='us-gaap'):
+    """
+    Stream-parse a companyfacts JSON document, yielding ``(concept, fact)``
+    for each fact of the requested concepts and units
+    """
+    item_prefixes = {
+        f"facts.{taxonomy}.{concept}.units.{unit}.item": concept
+        for concept in concepts
+        for unit in units
+    }
+    current_prefix = None
+    fact = None
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if current_prefix is None:
+            if event == 'start_map' and prefix in item_prefixes:
+                current_prefix, fact = prefix, {}
+        elif event == 'end_map' and prefix == current_prefix:
+            yield item_prefixes[current_prefix], fact
+            current_prefix = fact = None
+        elif event in ('string', 'number', 'boolean', 'null'):
+            fact[prefix[len(current_prefix) + 1:]] = value
+
+
+def companyfacts_to_frame(stream, company, concepts=SEC_CONCEPTS, units=SEC_UNITS):
+    """
+    Map the quarterly facts of a companyfacts document to Company/Metric/Date/Value rows
+    (values in millions)
+    """
+    rows = [
+        (concept, fact['end'], fact['val'])
+        for concept, fact in iter_companyfacts(stream, concepts, units)
+        if QUARTERLY_FRAME.match(fact.get('frame') or '')
+    ]
+    if not rows:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    
+    facts = pd.DataFrame(rows, columns=['Concept', 'Date', 'Value']).assign(Company=company)
+    return _facts_to_long(facts, concepts)
+
+
+def period_month_end(dates):
+    """
+    Month end a fiscal period end is keyed by, as in the other sources and
+    the workbook (e.g. 2025-03-28 -> 2025-03-31, 2024-01-01 -> 2023-12-31)
+    """
+    dates = pd.to_datetime(dates).dt.normalize()
+    return dates - pd.Timedelta(days=PERIOD_END_GRACE_DAYS) + pd.offsets.MonthEnd(0)
+
+
+def _facts_to_long(facts, concepts):
+    """
+    Company/Concept/Date/Value facts (values in USD) to long-format rows in
+    millions, dated by period_month_end; when several concepts map to the
+    same metric, the first one listed in ``concepts`` wins
+    """
+    priority = {concept: rank for rank, concept in enumerate(concepts)}
+    facts = facts.assign(
+        Metric=facts['Concept'].map(concepts),
+        Date=period_month_end(facts['Date']),
+        Value=facts['Value'] / 1e6,
+        Priority=facts['Concept'].map(priority),
+    )
+    facts = facts.sort_values('Priority', kind='stable').drop_duplicates(subset=['Company', 'Metric', 'Date'])
+    return facts[LONG_COLUMNS].sort_values(['Company', 'Metric', 'Date']).reset_index(drop=True)
+
+
+def frame_periods(quarters=SEC_FRAME_QUARTERS, until=None):
+    """
+    Frame labels of the last ``quarters`` calendar quarters completed before
+    ``until`` (default: today), oldest first, e.g. ['CY2024Q1', 'CY2024Q2']
+    """
+    last = pd.Timestamp(until if until is not None else pd.Timestamp.today()).to_period('Q') - 1
+    return [f"CY{period.year}Q{period.quarter}" for period in pd.period_range(last - (quarters - 1), last, freq='Q')]
+
+
+def frame_rows(payload, concept, ciks):
+    """
+    Company/Concept/Date/Value rows of one decoded XBRL frames response,
+    keeping the filers in ``ciks`` (CIK -> company label)
+    """
+    facts = pd.DataFrame(payload.get('data') or [], columns=['cik', 'end', 'val'])
+    companies = pd.Series(list(ciks.values()), index=pd.Index(list(ciks), dtype='int64'), name='Company')
+    facts = facts.join(companies, on=facts['cik'].astype('int64'), how='inner')
+    return pd.DataFrame({
+        'Company': facts['Company'],
+        'Concept': concept,
+        'Date': facts['end'],
+        'Value': facts['val'].astype('float64'),
+    })
+
+
+def extract_macrotrends_rows(content, metrics):
+    """
+    Pull the requested line items out of a Macrotrends statement page
+    (its embedded ``originalData`` array, or its HTML tables) as Metric/Date/Value rows
+    """
+    match = MACROTRENDS_DATA.search(content)
+    if match is not None:
+        text = content[match.end():].decode('utf-8', errors='replace')
+        records, _ = json.JSONDecoder().raw_decode(text)
+        table = pd.DataFrame.from_records(records)
+        table.index = table.pop('field_name').map(lambda name: HTML_TAG.sub('', str(name)).strip())
+    else:
+        try:
+            candidates = pd.read_html(io.BytesIO(content), flavor='lxml')
+        except ValueError:
+            # No <table> on the page
+            candidates = []
+        table = None
+        for candidate in candidates:
+            candidate = candidate.set_index(candidate.columns[0])
+            candidate.index = candidate.index.astype(str).str.strip()
+            if candidate.index.isin(metrics).any():
+                table = candidate
+                break
+        if table is None:
+            return pd.DataFrame(columns=['Metric', 'Date', 'Value'])
+    
+    # Keep only the wanted rows and the columns that are period end dates
+    dates = pd.to_datetime(pd.Index(table.columns).astype(str), format='%Y-%m-%d', errors='coerce')
+    table = table.loc[table.index.isin(metrics), ~dates.isna()]
+    table.columns = dates[~dates.isna()]
+    table = table[~table.index.duplicated()]
+    
+    # Cells are strings such as "$1,234.56" (or "" for periods not reported)
+    values = table.replace(r'[$,]', '', regex=True).apply(pd.to_numeric, errors='coerce')
+    values = values.rename_axis(index='Metric', columns='Date')
+    return values.stack().dropna().rename('Value').reset_index()
+
+
+def load_universe(source):
+    """
+    Load a ticker universe (a list of symbols, a Symbol/Name/CIK CSV or a
+    text file of symbols) as ``(companies, ciks)`` dicts keyed by symbol
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        symbols = [str(symbol).strip().upper() for symbol in source if str(symbol).strip()]
+        return {symbol: symbol for symbol in symbols}, {}
+    
+    with open(source) as f:
+        first_line = f.readline()
+    if 'symbol' not in first_line.lower():
+        with open(source) as f:
+            return load_universe([line.split('#')[0] for line in f])
+    
+    universe = pd.read_csv(source, dtype=str)
+    universe.columns = [column.strip().capitalize() for column in universe.columns]
+    universe = universe.dropna(subset=['Symbol']).drop_duplicates(subset=['Symbol'])
+    symbols = universe['Symbol'].str.strip().str.upper()
+    names = universe['Name'].fillna(symbols) if 'Name' in universe else symbols
+    companies = dict(zip(symbols, names))
+    ciks = {}
+    if 'Cik' in universe:
+        ciks = {
+            symbol: int(cik)
+            for symbol, cik in zip(symbols, universe['Cik'])
+            if isinstance(cik, str) and cik.strip().isdigit()
+        }
+    return companies, ciks
+
+
+def _merge_sources(frames, with_sources=False):
+    """
+    Merge long-format frames given in order of precedence into the wide
+    YAHOO_COLUMNS frame (plus the winning rows with ``with_sources``)
+    """
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LONG_COLUMNS)
+    # A source without a value for a period must not shadow one that has it
+    combined = combined[(combined['Metric'] != 'Inventory Turnover') & combined['Value'].notna()]
+    combined = combined.drop_duplicates(subset=KEY_COLUMNS, keep='first')
+    
+    if combined.empty:
+        data = pd.DataFrame(columns=YAHOO_COLUMNS)
+    else:
+        data = to_wide_format(combined, columns=YAHOO_COLUMNS)
+        data['Inventory Turnover'] = ratio_metric(data, 'Inventory Turnover')
+    if with_sources:
+        return data, combined.reindex(columns=[*LONG_COLUMNS, 'Source']).reset_index(drop=True)
+    return data
+
+
+def sources_path(output_file):
+    """
+    Provenance file (SOURCE_COLUMNS) kept next to a wide output file
+    """
+    return f"{os.path.splitext(output_file)[0]}_sources.csv"
+
+
+def restated_periods(merged_rows, recorded):
+    """
+    (Company, Date) periods of ``merged_rows`` (long rows with a Source) for
+    which a source of higher precedence than the ``recorded`` one now
+    reports a value
+    """
+    if merged_rows.empty or recorded.empty:
+        return pd.DataFrame(columns=['Company', 'Date'])
+    rank = {source: i for i, source in enumerate(SOURCES)}
+    current = merged_rows.merge(recorded, on=KEY_COLUMNS, suffixes=('', ' Recorded'))
+    better = current['Source'].map(rank) < current['Source Recorded'].map(rank)
+    return current.loc[better, ['Company', 'Date']].drop_duplicates(ignore_index=True)
+
+
+def record_sources(file_path, rows):
+    """
+    Insert or replace the Source of the given (Company, Metric, Date) rows
+    in a provenance file
+    """
+    stored = read_csv_if_exists(file_path, SOURCE_COLUMNS)
+    combined = pd.concat([stored, rows[SOURCE_COLUMNS]], ignore_index=True)
+    atomic_write_csv(combined.drop_duplicates(subset=KEY_COLUMNS, keep='last'), file_path)
+
+
+def _collect_shard(companies, automator_options, sources=COLLECT_SOURCES):
+    """
+    Process-pool worker: collect one shard of the universe
+    """
+    automator = FinancialDataAutomator(companies=companies, **automator_options)
+    return automator.collect(list(companies), sources=sources, with_sources=True)
+
+
 class FinancialDataAutomator:
     """
     A class to automate the collection of financial data from various sources
     """
     
-    def __init__(self):
-        self.companies = {
-            'WDC': 'Western Digital Corporation',
-            'MU': 'Micron Technology Inc.',
-            'TSM': 'Taiwan Semiconductor Manufacturing Company Limited',
-            'INTC': 'Intel Corporation'
+    def __init__(self, max_workers=8, rate_limits=None, cache_dir=DEFAULT_CACHE_DIR, cache_ttls=None,
+                 cache_max_bytes=512 * 1024 * 1024, companies=None, universe=None, endpoints=None,
+                 metrics_file=None, http_timeout=(5, 30), max_retries=4, sec_bulk=False, ciks=None):
+        self.companies = dict(companies or DEFAULT_COMPANIES)
+        self.ciks = {**DEFAULT_CIKS, **(ciks or {})}
+        if universe is not None:
+            self.companies, ciks = load_universe(universe)
+            self.ciks.update(ciks)
+        self.max_workers = max_workers
+        self.sec_bulk = sec_bulk
+        self.endpoints = {**DEFAULT_ENDPOINTS, **(endpoints or {})}
+        self.options = {
+            'max_workers': max_workers,
+            'rate_limits': {**DEFAULT_RATE_LIMITS, **(rate_limits or {})},
+            'cache_dir': cache_dir,
+            'cache_ttls': cache_ttls,
+            'cache_max_bytes': cache_max_bytes,
+            'endpoints': self.endpoints,
+            'metrics_file': metrics_file,
+            'http_timeout': http_timeout,
+            'max_retries': max_retries,
+            'sec_bulk': sec_bulk,
+            # Shards only get their tickers, so they need the universe's CIKs
+            'ciks': self.ciks,
         }
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.rate_limiters = {
+            host: TokenBucket(rate)
+            for host, rate in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()
+        }
+        # Pooled keep-alive connections (one slot per worker), timeouts,
+        # retries with backoff and a circuit breaker per host
+        self.transport = HttpTransport(
+            pool_size=max_workers,
+            timeout=http_timeout,
+            max_retries=max_retries,
+            throttle=self._throttle,
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+        )
+        self.session = self.transport.session
+        self.metrics = MetricsRecorder(jsonl_path=metrics_file)
+        self.cache = ResponseCache(
+            cache_dir,
+            ttls={**DEFAULT_CACHE_TTLS, **(cache_ttls or {})},
+            max_bytes=cache_max_bytes,
+        )
+    
+    def _throttle(self, host):
+        """
+        Wait for the rate limiter of the given host, if one is configured
+        """
+        limiter = self.rate_limiters.get(host)
+        if limiter is not None:
+            limiter.acquire()
+    
+    def _fetch(self, source, key, endpoint, url, headers=None):
+        """
+        GET a URL through the response cache and the shared transport, serving
+        fresh or revalidated entries (or stale ones while the host's circuit is open)
+        """
+        with self.metrics.span('fetch', source=source, symbol=str(key), endpoint=endpoint, retries=0) as span:
+            cached = self.cache.get(source, key, endpoint)
+            if cached is not None:
+                path, meta, fresh = cached
+                if fresh:
+                    span.update(cache='hit', status=200, bytes=meta['size'])
+                    return CachedResponse(200, path=path, from_cache=True)
+                headers = dict(headers or {})
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+            
+            try:
+                response = self.transport.get(url, headers=headers, stream=True)
+            except CircuitOpenError:
+                if cached is None:
+                    raise
+                logger.warning(f"{urlparse(url).hostname} is unavailable, serving stale {source} data for {key}")
+                span.update(cache='stale', status=200, bytes=cached[1]['size'])
+                return CachedResponse(200, path=cached[0], from_cache=True)
+            with response:
+                span.update(status=response.status_code, retries=response.retries)
+                if response.status_code == 304 and cached is not None:
+                    self.cache.revalidated(source, key, endpoint)
+                    span.update(cache='revalidated', bytes=0)
+                    return CachedResponse(200, path=cached[0], from_cache=True)
+                if response.status_code == 200:
+                    path = self.cache.put(
+                        source, key, endpoint,
+                        response.iter_content(chunk_size=64 * 1024),
+                        headers=response.headers,
+                    )
+                    span.update(cache='miss', bytes=os.path.getsize(path))
+                    return CachedResponse(200, path=path)
+                span.update(cache='miss', bytes=len(response.content))
+                return CachedResponse(response.status_code, body=response.content)
+    
+    def _download_yahoo_statements(self, symbol):
+        """
+        Download the quarterly income statement and balance sheet through yfinance
+        """
+        ticker = yf.Ticker(symbol)
+        self._throttle('query2.finance.yahoo.com')
+        quarterly_financials = ticker.quarterly_financials
+        self._throttle('query2.finance.yahoo.com')
+        quarterly_balance_sheet = ticker.quarterly_balance_sheet
+        return quarterly_financials, quarterly_balance_sheet
+    
+    def _yahoo_statements(self, symbol):
+        """
+        Return the quarterly income statement and balance sheet for a ticker,
+        served from the response cache while it is fresh
+        """
+        with self.metrics.span('fetch', source='yahoo', symbol=symbol, endpoint='quarterly_statements',
+                               retries=0) as span:
+            cached = self.cache.get('yahoo', symbol, 'quarterly_statements')
+            if cached is not None and cached[2]:
+                with open(cached[0]) as f:
+                    payload = json.load(f)
+                span.update(cache='hit', status=200, bytes=cached[1]['size'])
+                return _payload_to_frame(payload['financials']), _payload_to_frame(payload['balance_sheet'])
+            
+            quarterly_financials, quarterly_balance_sheet = self._download_yahoo_statements(symbol)
+            span.update(cache='miss', status=200 if not quarterly_financials.empty else 204)
+            
+            if not quarterly_financials.empty and not quarterly_balance_sheet.empty:
+                payload = json.dumps({
+                    'financials': _frame_to_payload(quarterly_financials),
+                    'balance_sheet': _frame_to_payload(quarterly_balance_sheet),
+                }).encode('utf-8')
+                span['bytes'] = len(payload)
+                self.cache.put('yahoo', symbol, 'quarterly_statements', [payload])
+            return quarterly_financials, quarterly_balance_sheet
     
     def get_yahoo_finance_data(self, symbol, period='1y'):
         """
@@ -39,77 +570,66 @@ class FinancialDataAutomator:
         """
         try:
             logger.info(f"Fetching Yahoo Finance data for {symbol}")
-            ticker = yf.Ticker(symbol)
             
             # Get quarterly financials
-            quarterly_financials = ticker.quarterly_financials
-            quarterly_balance_sheet = ticker.quarterly_balance_sheet
+            quarterly_financials, quarterly_balance_sheet = self._yahoo_statements(symbol)
             
-            # Extract key metrics
-            data = []
-            if not quarterly_financials.empty and not quarterly_balance_sheet.empty:
-                for date in quarterly_financials.columns:
-                    try:
-                        revenue = quarterly_financials.loc['Total Revenue', date] if 'Total Revenue' in quarterly_financials.index else None
-                        cogs = quarterly_financials.loc['Cost Of Revenue', date] if 'Cost Of Revenue' in quarterly_financials.index else None
-                        gross_profit = quarterly_financials.loc['Gross Profit', date] if 'Gross Profit' in quarterly_financials.index else None
-                        inventory = quarterly_balance_sheet.loc['Inventory', date] if 'Inventory' in quarterly_balance_sheet.index else None
-                        cash = quarterly_balance_sheet.loc['Cash And Cash Equivalents', date] if 'Cash And Cash Equivalents' in quarterly_balance_sheet.index else None
-                        
-                        # Convert to millions
-                        if revenue: revenue = revenue / 1e6
-                        if cogs: cogs = cogs / 1e6
-                        if gross_profit: gross_profit = gross_profit / 1e6
-                        if inventory: inventory = inventory / 1e6
-                        if cash: cash = cash / 1e6
-                        
-                        data.append({
-                            'Company': symbol,
-                            'Date': date,
-                            'Revenue': revenue,
-                            'Cost Of Goods Sold': cogs,
-                            'Gross Profit': gross_profit,
-                            'Inventory': inventory,
-                            'Cash On Hand': cash,
-                            'Inventory Turnover': cogs / inventory if (cogs and inventory and inventory != 0) else None
-                        })
-                    except Exception as e:
-                        logger.warning(f"Error processing date {date} for {symbol}: {e}")
-                        continue
+            if quarterly_financials.empty or quarterly_balance_sheet.empty:
+                return pd.DataFrame(columns=YAHOO_COLUMNS)
+            
+            # Select every needed line item for all dates at once; missing
+            # items or dates become NaN rather than being skipped
+            line_items = pd.concat([
+                quarterly_financials.reindex(index=list(YAHOO_INCOME_ITEMS)),
+                quarterly_balance_sheet.reindex(
+                    index=list(YAHOO_BALANCE_ITEMS),
+                    columns=quarterly_financials.columns,
+                ),
+            ])
+            
+            # Convert to millions
+            values = line_items.to_numpy(dtype='float64', na_value=np.nan).T / 1e6
+            
+            data = pd.DataFrame(
+                values,
+                columns=[*YAHOO_INCOME_ITEMS.values(), *YAHOO_BALANCE_ITEMS.values()],
+            )
+            data.insert(0, 'Date', pd.to_datetime(quarterly_financials.columns))
+            data.insert(0, 'Company', symbol)
+            data['Inventory Turnover'] = ratio_metric(data, 'Inventory Turnover')
             
-            return pd.DataFrame(data)
+            return data[YAHOO_COLUMNS]
             
         except Exception as e:
             logger.error(f"Error fetching Yahoo Finance data for {symbol}: {e}")
-            return pd.DataFrame()
+            return pd.DataFrame(columns=YAHOO_COLUMNS)
     
     def scrape_macrotrends_data(self, symbol):
         """
-        Scrape financial data from Macrotrends (example implementation)
-        Note: This is a simplified example. Real implementation would need to handle
-        dynamic content, pagination, and anti-bot measures.
+        Fetch the quarterly income statement and balance sheet of a ticker
+        from Macrotrends as long-format rows (see extract_macrotrends_rows)
         """
         try:
             logger.info(f"Scraping Macrotrends data for {symbol}")
             
-            # Example URLs (these would need to be actual Macrotrends URLs)
-            revenue_url = f"https://www.macrotrends.net/stocks/charts/{symbol}/revenue"
+            slug = MACROTRENDS_SLUGS.get(symbol, symbol.lower())
+            frames = []
+            for statement, metrics in MACROTRENDS_STATEMENTS.items():
+                url = f"{self.endpoints['macrotrends']}/stocks/charts/{symbol}/{slug}/{statement}?freq=Q"
+                response = self._fetch('macrotrends', symbol, statement, url)
+                if response.status_code != 200:
+                    logger.warning(f"Failed to access Macrotrends {statement} for {symbol}: {response.status_code}")
+                    continue
+                frames.append(extract_macrotrends_rows(response.content, metrics))
+            
+            rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Metric', 'Date', 'Value'])
+            rows.insert(0, 'Company', symbol)
+            logger.info(f"Extracted {len(rows)} Macrotrends values for {symbol}")
+            return rows[LONG_COLUMNS]
             
-            response = self.session.get(revenue_url)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # This is a placeholder - actual implementation would parse the HTML
-                # to extract financial data tables
-                logger.info(f"Successfully accessed Macrotrends for {symbol}")
-                return {"status": "success", "message": "Data scraped successfully"}
-            else:
-                logger.warning(f"Failed to access Macrotrends for {symbol}: {response.status_code}")
-                return {"status": "error", "message": f"HTTP {response.status_code}"}
-                
         except Exception as e:
             logger.error(f"Error scraping Macrotrends for {symbol}: {e}")
-            return {"status": "error", "message": str(e)}
+            return pd.DataFrame(columns=LONG_COLUMNS)
     
     def get_sec_edgar_data(self, cik):
         """
@@ -119,15 +639,9 @@ class FinancialDataAutomator:
             logger.info(f"Fetching SEC EDGAR data for CIK {cik}")
             
             # SEC EDGAR API endpoint
-            url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik:010d}.json"
+            url = f"{self.endpoints['sec']}/api/xbrl/companyfacts/CIK{cik:010d}.json"
             
-            headers = {
-                'User-Agent': 'YourCompany your.email@company.com',
-                'Accept-Encoding': 'gzip, deflate',
-                'Host': 'data.sec.gov'
-            }
-            
-            response = requests.get(url, headers=headers)
+            response = self._fetch('sec', cik, 'companyfacts', url, headers=SEC_HEADERS)
             if response.status_code == 200:
                 data = response.json()
                 logger.info(f"Successfully fetched SEC data for CIK {cik}")
@@ -140,59 +654,397 @@ class FinancialDataAutomator:
             logger.error(f"Error fetching SEC data for CIK {cik}: {e}")
             return None
     
-    def automated_data_collection(self):
+    def get_sec_edgar_facts(self, cik, company=None, concepts=SEC_CONCEPTS):
+        """
+        Fetch SEC EDGAR companyfacts and keep only the requested concepts as
+        long-format rows
+        """
+        company = company or str(cik)
+        try:
+            logger.info(f"Fetching SEC EDGAR facts for CIK {cik}")
+            url = f"{self.endpoints['sec']}/api/xbrl/companyfacts/CIK{cik:010d}.json"
+            response = self._fetch('sec', cik, 'companyfacts', url, headers=SEC_HEADERS)
+            if response.status_code != 200:
+                logger.warning(f"Failed to fetch SEC data for CIK {cik}: {response.status_code}")
+                return pd.DataFrame(columns=LONG_COLUMNS)
+            
+            with response.open() as stream:
+                return companyfacts_to_frame(stream, company, concepts)
+                
+        except Exception as e:
+            logger.error(f"Error parsing SEC facts for CIK {cik}: {e}")
+            return pd.DataFrame(columns=LONG_COLUMNS)
+    
+    def get_sec_frames(self, ciks=None, concepts=SEC_CONCEPTS, periods=None, units=SEC_UNITS, max_workers=None):
         """
-        Main automation function that collects data from multiple sources
+        Fetch the last ``periods`` quarters of SEC XBRL frames and keep the
+        filers in ``ciks`` (CIK -> company label) as long-format rows
         """
-        logger.info("Starting automated data collection")
+        if ciks is None:
+            ciks = {cik: symbol for symbol, cik in self.ciks.items()}
+        periods = periods or frame_periods()
         
-        all_data = []
+        def fetch_frame(concept, unit, period):
+            frame = f"{period}I" if concept in SEC_INSTANT_CONCEPTS else period
+            url = f"{self.endpoints['sec']}/api/xbrl/frames/us-gaap/{concept}/{unit}/{frame}.json"
+            response = self._fetch('sec', f"{concept}/{unit}", f"frames/{frame}", url, headers=SEC_HEADERS)
+            if response.status_code != 200:
+                logger.info(f"No SEC frame {concept} {unit} {frame}: {response.status_code}")
+                return None
+            with response.open() as stream:
+                return json.load(stream)
         
-        for symbol, company_name in self.companies.items():
-            logger.info(f"Processing {company_name} ({symbol})")
-            
-            # Method 1: Yahoo Finance API
-            yahoo_data = self.get_yahoo_finance_data(symbol)
-            if not yahoo_data.empty:
-                all_data.append(yahoo_data)
-            
-            # Method 2: Web scraping (Macrotrends example)
-            scrape_result = self.scrape_macrotrends_data(symbol)
-            logger.info(f"Macrotrends scraping result for {symbol}: {scrape_result}")
-            
-            # Add delay to be respectful to servers
-            time.sleep(2)
+        logger.info(f"Fetching {len(concepts) * len(units) * len(periods)} SEC frames for {len(ciks)} filers")
+        parts = []
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            futures = {
+                executor.submit(fetch_frame, concept, unit, period): concept
+                for concept in concepts
+                for unit in units
+                for period in periods
+            }
+            for future in as_completed(futures):
+                concept = futures[future]
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching SEC frame of {concept}: {e}")
+                    continue
+                if payload is not None:
+                    parts.append(frame_rows(payload, concept, ciks))
+        
+        parts = [part for part in parts if not part.empty]
+        if not parts:
+            return pd.DataFrame(columns=LONG_COLUMNS)
+        return _facts_to_long(pd.concat(parts, ignore_index=True), concepts)
+    
+    def ingest_companyfacts_archive(self, archive_path, ciks=None, concepts=SEC_CONCEPTS):
+        """
+        Bulk-ingest the filers in ``ciks`` from SEC's offline companyfacts.zip
+        archive as long-format rows
+        """
+        if ciks is None:
+            ciks = {cik: symbol for symbol, cik in self.ciks.items()}
+        
+        frames = []
+        with zipfile.ZipFile(archive_path) as archive:
+            for cik, company in ciks.items():
+                member = f"CIK{int(cik):010d}.json"
+                try:
+                    with archive.open(member) as stream:
+                        frames.append(companyfacts_to_frame(stream, company, concepts))
+                except KeyError:
+                    logger.warning(f"CIK {cik} not found in {archive_path}")
+                except Exception as e:
+                    logger.error(f"Error parsing {member} from {archive_path}: {e}")
+        
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=LONG_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+    
+    @staticmethod
+    def _restatable(recorded, sources):
+        """
+        Tickers whose latest published quarter came from a source of lower
+        precedence than the best of ``sources``
+        """
+        if recorded.empty:
+            return set()
+        rank = {source: i for i, source in enumerate(SOURCES)}
+        best = min(rank[source] for source in sources)
+        latest = recorded['Date'] == recorded.groupby('Company')['Date'].transform('max')
+        return set(recorded.loc[latest & (recorded['Source'].map(rank) > best), 'Company'])
+    
+    @staticmethod
+    def _stale_symbols(stored_long, symbols):
+        """
+        Tickers for which a newer quarter than the stored ones may exist
+        """
+        if stored_long.empty:
+            return set(symbols)
+        oldest_latest = latest_dates(stored_long).groupby(level='Company').min()
+        current = oldest_latest.index[
+            pd.Timestamp.today().normalize() < oldest_latest + pd.Timedelta(days=QUARTER_REFRESH_DAYS)
+        ]
+        return set(symbols) - set(current)
+    
+    def collect(self, symbols, max_workers=None, sources=COLLECT_SOURCES, with_sources=False):
+        """
+        Fetch the given sources for the given tickers concurrently and return
+        the merged wide frame (YAHOO_COLUMNS), without writing anything
+        """
+        max_workers = max_workers or self.max_workers
+        collected = {source: [] for source in SOURCES}
         
-        # Combine all data
-        if all_data:
-            combined_data = pd.concat(all_data, ignore_index=True)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for symbol in symbols:
+                logger.info(f"Processing {self.companies.get(symbol, symbol)} ({symbol})")
+                
+                # Method 1: Yahoo Finance API
+                if 'yahoo' in sources:
+                    futures[executor.submit(self.get_yahoo_finance_data, symbol)] = ('yahoo', symbol)
+                
+                # Method 2: Web scraping (Macrotrends example)
+                if 'macrotrends' in sources:
+                    futures[executor.submit(self.scrape_macrotrends_data, symbol)] = ('macrotrends', symbol)
+                
+                # Method 3: SEC EDGAR companyfacts, one request per filer
+                if 'sec' in sources and not self.sec_bulk and symbol in self.ciks:
+                    futures[executor.submit(self.get_sec_edgar_facts, self.ciks[symbol], symbol)] = ('sec', symbol)
             
-            # Save to CSV
-            output_file = '/home/ubuntu/project/automated_financial_data.csv'
-            combined_data.to_csv(output_file, index=False)
-            logger.info(f"Saved automated data to {output_file}")
+            # Bulk mode: SEC frames cover all tickers at once
+            if 'sec' in sources and self.sec_bulk:
+                ciks = {self.ciks[symbol]: symbol for symbol in symbols if symbol in self.ciks}
+                futures[executor.submit(self.get_sec_frames, ciks)] = ('sec', f"{len(ciks)} filers")
             
-            return combined_data
-        else:
+            for future in as_completed(futures):
+                source, symbol = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Error collecting {source} data for {symbol}: {e}")
+                    continue
+                
+                if result.empty:
+                    continue
+                rows = to_long_format(result) if source == 'yahoo' else result
+                collected[source].append(rows.assign(Source=source))
+        
+        return _merge_sources([frame for source in SOURCES for frame in collected[source]], with_sources)
+    
+    def collect_batch(self, symbols, shard_size=50, processes=None, sources=COLLECT_SOURCES, with_sources=False):
+        """
+        Collect a large universe in shards of ``shard_size`` tickers run in a
+        process pool, sharing the per-host rate limits between the processes
+        """
+        processes = processes or os.cpu_count() or 1
+        shards = [symbols[i:i + shard_size] for i in range(0, len(symbols), shard_size)]
+        processes = max(1, min(processes, len(shards)))
+        options = dict(self.options)
+        options['rate_limits'] = {host: rate / processes for host, rate in options['rate_limits'].items()}
+        
+        sec_rows = pd.DataFrame(columns=LONG_COLUMNS)
+        if 'sec' in sources and self.sec_bulk:
+            sec_rows = self.get_sec_frames({self.ciks[symbol]: symbol for symbol in symbols if symbol in self.ciks})
+            sources = tuple(source for source in sources if source != 'sec')
+        
+        results = []
+        if sources:
+            logger.info(f"Collecting {len(symbols)} tickers in {len(shards)} shards on {processes} processes")
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = {
+                    executor.submit(
+                        _collect_shard, {symbol: self.companies.get(symbol, symbol) for symbol in shard}, options,
+                        sources
+                    ): shard
+                    for shard in shards
+                }
+                for future in as_completed(futures):
+                    shard = futures[future]
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"Shard {shard[0]}..{shard[-1]} failed: {e}")
+        
+        # Shard results take precedence over the SEC frames
+        rows = [shard_rows for _, shard_rows in results if not shard_rows.empty]
+        if not sec_rows.empty:
+            rows.append(sec_rows.assign(Source='sec'))
+        return _merge_sources(rows, with_sources)
+    
+    def automated_data_collection(self, max_workers=None, incremental=True,
+                                  output_file=DEFAULT_OUTPUT_FILE, long_output_file=DEFAULT_LONG_OUTPUT_FILE,
+                                  store_dir=DEFAULT_STORE_DIR, processes=None, shard_size=50,
+                                  sources=COLLECT_SOURCES):
+        """
+        Main automation function that collects data from multiple sources,
+        publishes the new quarters to the CSVs and the Parquet store and returns them
+        """
+        max_workers = max_workers or self.max_workers
+        logger.info(f"Starting automated data collection ({max_workers} workers)")
+        
+        stored_long = pd.DataFrame(columns=LONG_COLUMNS)
+        recorded = pd.DataFrame(columns=SOURCE_COLUMNS)
+        symbols = list(self.companies)
+        if incremental:
+            stored_long = to_long_format(read_csv_if_exists(output_file, YAHOO_COLUMNS))
+            recorded = read_csv_if_exists(sources_path(output_file), SOURCE_COLUMNS)
+            refresh = self._restatable(recorded, sources) | self._stale_symbols(stored_long, symbols)
+            symbols = [symbol for symbol in symbols if symbol in refresh]
+            if not symbols:
+                logger.info(f"All {len(self.companies)} tickers are up to date")
+                return pd.DataFrame(columns=YAHOO_COLUMNS)
+            logger.info(f"{len(symbols)} of {len(self.companies)} tickers may have new quarters")
+        
+        with self.metrics.span('collect', source='+'.join(sources), symbols=len(symbols)):
+            if processes and processes > 1:
+                collected, merged_rows = self.collect_batch(symbols, shard_size=shard_size, processes=processes,
+                                                            sources=sources, with_sources=True)
+            else:
+                collected, merged_rows = self.collect(symbols, max_workers=max_workers, sources=sources,
+                                                      with_sources=True)
+        
+        if collected.empty:
             logger.warning("No data collected from automation")
-            return pd.DataFrame()
+            return pd.DataFrame(columns=YAHOO_COLUMNS)
+        
+        # Keep the periods we do not have yet, and the stored ones that a
+        # source of higher precedence than the recorded one now reports
+        collected_long = to_long_format(collected)
+        periods = pd.MultiIndex.from_frame(restated_periods(merged_rows, recorded))
+        restated = pd.Series(
+            pd.MultiIndex.from_frame(collected_long[['Company', 'Date']]).isin(periods), index=collected_long.index
+        )
+        new_long = collected_long[
+            restated | collected_long.index.isin(newer_than_stored(collected_long, stored_long).index)
+        ]
+        if new_long.empty:
+            logger.info("No new quarters since the last run")
+            return pd.DataFrame(columns=YAHOO_COLUMNS)
+        combined_data = to_wide_format(new_long, columns=YAHOO_COLUMNS)
+        
+        # Save to CSV
+        if incremental:
+            upsert_wide_csv(output_file, combined_data)
+        else:
+            atomic_write_csv(combined_data, output_file)
+        logger.info(f"Saved {len(combined_data)} rows of automated data to {output_file}")
+        
+        dashboard_long = new_long.assign(
+            Company=new_long['Company'].map(lambda symbol: COMPANY_DISPLAY_NAMES.get(symbol, symbol))
+        )
+        if incremental:
+            published = newer_than_stored(dashboard_long, read_csv_if_exists(long_output_file, LONG_COLUMNS))
+            dashboard_long = dashboard_long[
+                dashboard_long.index.isin(published.index) | restated[dashboard_long.index].to_numpy()
+            ]
+        if not dashboard_long.empty:
+            stored_rows = upsert_long_csv(long_output_file, dashboard_long)
+            logger.info(f"Upserted {len(dashboard_long)} rows into {long_output_file}")
+            record_sources(sources_path(output_file), merged_rows.merge(new_long.loc[dashboard_long.index, KEY_COLUMNS]))
+            
+            with self.metrics.span('write_store') as span:
+                span['partitions'] = refresh_store(stored_rows, dashboard_long, store_dir)
+            logger.info(f"Rewrote {span['partitions']} partitions of {store_dir} (including derived metrics)")
+        
+        return combined_data
+    
+    def run_scheduler(self, schedule=None, jitter=SCHEDULE_JITTER, stop_event=None, max_runs=None,
+                      **collection_options):
+        """
+        Run an automated_data_collection of every source of ``schedule``
+        ({source: seconds}) on its own cadence until ``stop_event`` is set; returns the runs
+        """
+        schedule = dict(schedule or parse_schedule([]))
+        stop_event = stop_event or threading.Event()
+        rng = random.Random()
+        start = time.monotonic()
+        queue = [(start + rng.uniform(0, interval * jitter), source) for source, interval in schedule.items()]
+        heapq.heapify(queue)
+        logger.info("Scheduler started: " + ', '.join(f"{source} every {interval}s" for source, interval in schedule.items()))
+        
+        runs = 0
+        while max_runs is None or runs < max_runs:
+            due, source = heapq.heappop(queue)
+            if stop_event.wait(max(0.0, due - time.monotonic())):
+                break
+            logger.info(f"Scheduled refresh of {source}")
+            try:
+                self.automated_data_collection(sources=(source,), **collection_options)
+            except Exception as e:
+                logger.error(f"Scheduled refresh of {source} failed: {e}")
+            runs += 1
+            interval = schedule[source] * (1 + rng.uniform(-jitter, jitter))
+            heapq.heappush(queue, (time.monotonic() + interval, source))
+        
+        logger.info(f"Scheduler stopped after {runs} runs")
+        return runs
+
+def parse_schedule(entries, sources=None):
+    """
+    Per-source intervals from DEFAULT_SCHEDULE, restricted to ``sources``
+    (default: COLLECT_SOURCES) and overridden by SOURCE=SECONDS entries
+    """
+    sources = sources or COLLECT_SOURCES
+    schedule = {source: interval for source, interval in DEFAULT_SCHEDULE.items() if source in sources}
+    for entry in entries:
+        source, _, seconds = entry.partition('=')
+        if source not in SOURCES or not seconds:
+            raise ValueError(f"Invalid interval {entry!r}; expected SOURCE=SECONDS with SOURCE in {SOURCES}")
+        schedule[source] = float(seconds)
+    return schedule
 
-def main():
+def main(argv=None):
     """
-    Main function to demonstrate the automation approach
+    Run one incremental collection (the default) or, with --daemon, keep
+    refreshing every source on its own schedule
     """
-    automator = FinancialDataAutomator()
+    parser = argparse.ArgumentParser(description="Collect quarterly financials of the tracked semiconductor companies")
+    parser.add_argument('--daemon', action='store_true', help="Keep running and refresh each source on its own cadence")
+    parser.add_argument('--sources', nargs='+', choices=SOURCES,
+                        help=f"Sources to fetch (default: {' '.join(COLLECT_SOURCES)})")
+    parser.add_argument('--interval', action='append', default=[], metavar='SOURCE=SECONDS',
+                        help="Override a source's refresh interval in daemon mode (repeatable)")
+    parser.add_argument('--jitter', type=float, default=SCHEDULE_JITTER,
+                        help="Random spread of every scheduled wait, as a fraction of the interval")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help="Wide CSV of the collected quarters")
+    parser.add_argument('--long-output', default=DEFAULT_LONG_OUTPUT_FILE, help="Long-format CSV read by the dashboard")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Parquet store published to the dashboard")
+    parser.add_argument('--universe',
+                        help="CSV (Symbol, optional Name and CIK columns) or text file of the tickers to collect")
+    parser.add_argument('--processes', type=int, help="Split the universe into shards run in this many processes")
+    parser.add_argument('--metrics-file', help="Append timing spans to this file as JSON lines")
+    parser.add_argument('--full', action='store_true', help="Refetch every ticker instead of only stale ones")
+    parser.add_argument('--sec-bulk', action='store_true',
+                        help="Fetch SEC data as XBRL frames (one request per concept and quarter) "
+                             "instead of one companyfacts request per filer")
+    args = parser.parse_args(argv)
+    
+    collection_options = {
+        'incremental': not args.full,
+        'output_file': args.output,
+        'long_output_file': args.long_output,
+        'store_dir': args.store_dir,
+        'processes': args.processes,
+    }
+    
+    if args.daemon:
+        try:
+            schedule = parse_schedule(args.interval, args.sources)
+        except ValueError as e:
+            parser.error(str(e))
+        # Cached responses expire before their source's next slot, so every
+        # scheduled run at least revalidates them
+        automator = FinancialDataAutomator(
+            cache_ttls={source: interval * (1 - args.jitter) for source, interval in schedule.items()},
+            universe=args.universe,
+            metrics_file=args.metrics_file,
+            sec_bulk=args.sec_bulk,
+        )
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        try:
+            automator.run_scheduler(schedule, jitter=args.jitter, stop_event=stop_event, **collection_options)
+        except KeyboardInterrupt:
+            logger.info("Scheduler interrupted")
+        return
+    
+    automator = FinancialDataAutomator(universe=args.universe, metrics_file=args.metrics_file,
+                                       sec_bulk=args.sec_bulk)
     
     print("=== Financial Data Automation Demo ===")
     print("This script demonstrates various approaches for automating competitor data collection:")
     print("1. Yahoo Finance API - Free, reliable for basic financial data")
-    print("2. Web Scraping - For sites like Macrotrends, requires careful implementation")
-    print("3. SEC EDGAR API - Official government data, comprehensive but complex")
+    print("2. Web Scraping - Macrotrends statement pages (embedded chart data)")
+    print("3. SEC EDGAR API - Official government data, per filer or as cross-sectional XBRL frames")
     print("4. Third-party APIs - Paid services like Alpha Vantage, Quandl, etc.")
     print()
     
-    # Run automation
-    result_data = automator.automated_data_collection()
+    # Run automation (only quarters newer than the stored ones are fetched)
+    result_data = automator.automated_data_collection(sources=tuple(args.sources or COLLECT_SOURCES),
+                                                      **collection_options)
     
     if not result_data.empty:
         print(f"Successfully collected data for {result_data['Company'].nunique()} companies")
@@ -200,18 +1052,25 @@ def main():
         print("\nSample data:")
         print(result_data.head().to_string())
     else:
-        print("No data was collected. This may be due to API limitations or network issues.")
+        print("No new quarters were collected: everything is up to date, or the sources returned nothing "
+              "(see the log for API limitations or network issues).")
+    
+    print("\n=== Slowest Stages ===")
+    print(automator.metrics.slowest().to_string(index=False))
     
     print("\n=== Tech Stack Summary ===")
     print("Technologies used in this automation:")
     print("- Python: Core programming language")
     print("- pandas: Data manipulation and analysis")
     print("- requests: HTTP requests for APIs and web scraping")
-    print("- BeautifulSoup: HTML parsing for web scraping")
+    print("- lxml: Fallback HTML table parsing for web scraping")
+    print("- ijson: Streaming parser for SEC EDGAR companyfacts")
     print("- yfinance: Yahoo Finance API wrapper")
     print("- logging: Error handling and monitoring")
+    print("- instrumentation: Timing spans exported as JSON lines / Prometheus text")
     print("- json: Data serialization")
-    print("- time: Rate limiting and delays")
+    print("- concurrent.futures: Parallel collection across tickers and sources")
+    print("- time: Per-host token bucket rate limiting")
 
 if __name__ == "__main__":
     main()
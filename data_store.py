@@ -0,0 +1,556 @@
+"""
+Storage helpers for the long-format Company/Metric/Date/Value dataset
+shared by the data automation script and the Streamlit dashboard.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+LONG_COLUMNS = ['Company', 'Metric', 'Date', 'Value']
+KEY_COLUMNS = ['Company', 'Metric', 'Date']
+PARTITION_COLUMNS = ['Company', 'Metric']
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV_PATH = os.path.join(BASE_DIR, 'processed_inventory_data.csv')
+DEFAULT_STORE_DIR = os.path.join(BASE_DIR, 'inventory_store')
+
+# Data file of each Company=/Metric= partition directory, and the manifest
+# listing the store version in which every partition last changed. Names
+# starting with '_' or '.' are skipped by Parquet dataset discovery.
+PARTITION_FILE = 'part-0.parquet'
+STORE_MANIFEST = '_manifest.json'
+
+# Serializes manifest updates of writers within one process
+_manifest_lock = threading.Lock()
+
+# Process umask, read once (os.umask can only be queried by setting it);
+# new files get the permissions open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# In-memory values are kept as float32 when the round trip stays within this
+# tolerance (7 significant digits, or the 4 decimals stored in the CSV)
+FLOAT32_RTOL = 1e-7
+FLOAT32_ATOL = 0.5e-4
+
+# Metrics reported by the sources; everything else is derived from them
+BASE_METRICS = ['Revenue', 'Cost Of Goods Sold', 'Gross Profit', 'Inventory', 'Cash On Hand']
+
+DAYS_PER_QUARTER = 365 / 4
+
+# Per-quarter ratios: name -> (numerator, denominator, scale)
+RATIO_METRICS = {
+    'Inventory Turnover': ('Cost Of Goods Sold', 'Inventory', 1),
+    'Days Inventory Outstanding': ('Inventory', 'Cost Of Goods Sold', DAYS_PER_QUARTER),
+    'Gross Margin': ('Gross Profit', 'Revenue', 100),
+    'Cash To Revenue': ('Cash On Hand', 'Revenue', 1),
+    'Cash To Inventory': ('Cash On Hand', 'Inventory', 1),
+}
+
+# Ratios that use average inventory, (opening + closing) / 2 with the
+# previous quarter's closing balance as opening one, as in the analysts'
+# workbook. A company's first quarter (or one after a gap) uses the closing
+# balance alone.
+AVERAGE_INVENTORY_RATIOS = ('Inventory Turnover', 'Days Inventory Outstanding')
+
+# Growth rates (in %) of every base metric: suffix -> (lag in quarters,
+# accepted range of days between the two periods). Periods whose
+# predecessor is missing or not the expected distance away get no value.
+GROWTH_PERIODS = {
+    'QoQ Growth': (1, (80, 100)),
+    'YoY Growth': (4, (350, 380)),
+}
+
+DERIVED_METRICS = [
+    *RATIO_METRICS,
+    *(f"{metric} {suffix}" for metric in BASE_METRICS for suffix in GROWTH_PERIODS),
+]
+
+
+def _categorical(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.remove_unused_categories()
+        if values.cat.categories.inferred_type == 'string':
+            return values
+    labels = values.astype(str)
+    return pd.Categorical(labels, categories=pd.unique(labels))
+
+
+def compact_values(values):
+    """
+    Values as float32 where that keeps their precision, float64 otherwise
+    """
+    values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+    narrow = values.astype(np.float32)
+    with np.errstate(over='ignore', invalid='ignore'):
+        if np.allclose(narrow, values, rtol=FLOAT32_RTOL, atol=FLOAT32_ATOL, equal_nan=True):
+            return narrow
+    return values
+
+
+def normalize_long(df, compact=True):
+    """
+    Cast long-format rows to the canonical schema
+
+    Company and Metric become categoricals (categories in order of first
+    appearance), Date datetime64[ns] and Value float32 where precision
+    allows (float64 with ``compact=False``). Rows without a date or value
+    are dropped and duplicate (Company, Metric, Date) keys keep the last
+    row. Raises ValueError when a column is missing.
+    """
+    missing = [column for column in LONG_COLUMNS if column not in df]
+    if missing:
+        raise ValueError(f"Long-format rows are missing columns: {missing}")
+    frame = pd.DataFrame({
+        'Company': _categorical(df['Company']),
+        'Metric': _categorical(df['Metric']),
+        'Date': pd.to_datetime(df['Date']).astype('datetime64[ns]'),
+        'Value': pd.to_numeric(df['Value'], errors='coerce').astype(np.float64),
+    })
+    frame = frame.dropna(subset=['Date', 'Value'])
+    frame = frame[~frame.duplicated(subset=KEY_COLUMNS, keep='last')].reset_index(drop=True)
+    if compact:
+        frame['Value'] = compact_values(frame['Value'])
+    for column in ('Company', 'Metric'):
+        frame[column] = frame[column].cat.remove_unused_categories()
+    return frame
+
+
+def to_long_format(wide_df, id_columns=('Company', 'Date')):
+    """
+    Melt a wide frame (one column per metric) into Company/Metric/Date/Value rows
+    """
+    if wide_df.empty:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    long_df = wide_df.melt(id_vars=list(id_columns), var_name='Metric', value_name='Value')
+    long_df = long_df.dropna(subset=['Value'])
+    return long_df[LONG_COLUMNS].reset_index(drop=True)
+
+
+def to_wide_format(long_df, columns=None):
+    """
+    Pivot Company/Metric/Date/Value rows back to one row per (Company, Date)
+    """
+    wide_df = long_df.pivot_table(
+        index=['Company', 'Date'], columns='Metric', values='Value', aggfunc='last'
+    ).reset_index()
+    wide_df.columns.name = None
+    if columns is not None:
+        wide_df = wide_df.reindex(columns=columns)
+    return wide_df
+
+
+def _keys(wide_df, name):
+    if name in wide_df.columns:
+        return wide_df[name].to_numpy()
+    return wide_df.index.get_level_values(name).to_numpy()
+
+
+def average_balance(wide_df, column):
+    """
+    Average of the opening and closing ``column`` balance of every row of a
+    wide frame keyed by Company and Date (as columns or index levels), the
+    opening balance being the closing one of the company's previous quarter
+    """
+    min_days, max_days = GROWTH_PERIODS['QoQ Growth'][1]
+    rows = pd.DataFrame({
+        'Company': _keys(wide_df, 'Company'),
+        'Date': pd.to_datetime(_keys(wide_df, 'Date')),
+        'Value': wide_df[column].to_numpy(dtype='float64'),
+    }).sort_values(['Company', 'Date'], kind='stable')
+    grouped = rows.groupby('Company', sort=False)
+    gap = (rows['Date'] - grouped['Date'].shift(1)).dt.days
+    opening = grouped['Value'].shift(1).where(gap.between(min_days, max_days))
+    average = ((rows['Value'] + opening) / 2).fillna(rows['Value'])
+    return pd.Series(average.sort_index().to_numpy(), index=wide_df.index, name=column)
+
+
+def ratio_metric(wide_df, name):
+    """
+    One of the RATIO_METRICS computed from a wide frame; zero denominators give NaN
+    """
+    numerator, denominator, scale = RATIO_METRICS[name]
+    columns = {numerator: wide_df[numerator], denominator: wide_df[denominator]}
+    if name in AVERAGE_INVENTORY_RATIOS:
+        columns['Inventory'] = average_balance(wide_df, 'Inventory')
+    divisor = columns[denominator]
+    return columns[numerator] / divisor.where(divisor != 0) * scale
+
+
+def add_derived_metrics(long_df):
+    """
+    Replace any derived rows of ``long_df`` with DERIVED_METRICS recomputed
+    from its base metrics
+
+    Everything is computed on one (Company, Date) x Metric matrix: ratios are
+    column arithmetic and growth rates compare each row with the row ``lag``
+    periods earlier of the same company, so the cost does not depend on the
+    number of companies. Pass the complete history of every company whose
+    derived rows should be (re)computed.
+
+    Inventory Turnover reported by a source (e.g. the analysts' workbook,
+    whose first quarters use openings that are not in the dataset) is kept;
+    computed values only fill the periods without one, and Days Inventory
+    Outstanding follows the final turnover.
+    """
+    reported = long_df[long_df['Metric'] == 'Inventory Turnover']
+    base = long_df[~long_df['Metric'].isin(DERIVED_METRICS)]
+    if base.empty:
+        return base[LONG_COLUMNS].reset_index(drop=True)
+    base = base.assign(Company=base['Company'].astype(str), Metric=base['Metric'].astype(str))
+    wide = base.pivot_table(
+        index=['Company', 'Date'], columns='Metric', values='Value', aggfunc='last'
+    ).reindex(columns=BASE_METRICS).sort_index()
+    
+    derived = {name: ratio_metric(wide, name) for name in RATIO_METRICS}
+    if not reported.empty:
+        reported = reported.assign(Company=reported['Company'].astype(str)).groupby(['Company', 'Date'])['Value'].last()
+        turnover = pd.to_numeric(reported, errors='coerce').reindex(wide.index).combine_first(
+            derived['Inventory Turnover']
+        )
+        derived['Inventory Turnover'] = turnover
+        derived['Days Inventory Outstanding'] = DAYS_PER_QUARTER / turnover.where(turnover != 0)
+    
+    companies = wide.index.get_level_values('Company')
+    dates = pd.Series(wide.index.get_level_values('Date'), index=wide.index)
+    for suffix, (lag, (min_days, max_days)) in GROWTH_PERIODS.items():
+        previous = wide.groupby(companies, sort=False).shift(lag)
+        gap = (dates - dates.groupby(companies, sort=False).shift(lag)).dt.days
+        growth = (wide - previous) / previous.abs().where(previous != 0) * 100
+        growth = growth.where(gap.between(min_days, max_days), axis=0)
+        for metric in BASE_METRICS:
+            derived[f"{metric} {suffix}"] = growth[metric]
+    
+    derived_long = (
+        pd.DataFrame(derived)
+        .rename_axis(columns='Metric')
+        .stack()
+        .dropna()
+        .rename('Value')
+        .reset_index()
+    )
+    return pd.concat([base[LONG_COLUMNS], derived_long[LONG_COLUMNS]], ignore_index=True)
+
+
+def read_csv_if_exists(file_path, columns):
+    """
+    Read a stored CSV with parsed dates, or return an empty frame with the given columns
+    """
+    if not os.path.exists(file_path):
+        return pd.DataFrame(columns=columns)
+    df = pd.read_csv(file_path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def latest_dates(long_df):
+    """
+    Latest stored Date per (Company, Metric)
+    """
+    if long_df.empty:
+        return pd.Series(dtype='datetime64[ns]', name='Latest')
+    return long_df.groupby(['Company', 'Metric'])['Date'].max().rename('Latest')
+
+
+def newer_than_stored(new_long, stored_long):
+    """
+    Keep only the rows of ``new_long`` dated after the latest stored period of
+    their (Company, Metric) pair
+    """
+    if new_long.empty or stored_long.empty:
+        return new_long
+    latest = new_long.join(latest_dates(stored_long), on=['Company', 'Metric'])['Latest']
+    return new_long[latest.isna() | (new_long['Date'] > latest)]
+
+
+@contextmanager
+def atomic_write(file_path, mode='w', **open_kwargs):
+    """
+    Open a hidden temporary file next to ``file_path`` and rename it into
+    place when the block completes, so readers never see a partially written
+    file; if the block (or the rename) fails the temporary file is removed
+
+    The file gets the umask's default mode, as open() would create it;
+    mkstemp alone makes it readable by its owner only.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        if hasattr(os, 'fchmod'):  # POSIX only; Windows has no mode bits to fix
+            os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def atomic_write_csv(df, file_path):
+    """
+    Atomically write a long or wide frame as CSV
+    """
+    with atomic_write(file_path, newline='') as f:
+        df.to_csv(f, index=False, date_format='%Y-%m-%d')
+
+
+def upsert_long_csv(file_path, new_long):
+    """
+    Insert or replace (Company, Metric, Date) rows in a long-format CSV
+    """
+    stored = read_csv_if_exists(file_path, LONG_COLUMNS)
+    combined = pd.concat([stored, new_long[LONG_COLUMNS]], ignore_index=True)
+    combined = combined.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    atomic_write_csv(combined, file_path)
+    return combined
+
+
+def upsert_wide_csv(file_path, new_wide, key_columns=('Company', 'Date')):
+    """
+    Insert or replace (Company, Date) rows in a wide CSV; values missing from
+    the new rows keep their stored value
+    """
+    key_columns = list(key_columns)
+    stored = read_csv_if_exists(file_path, list(new_wide.columns))
+    if stored.empty:
+        combined = new_wide
+    else:
+        combined = (
+            new_wide.set_index(key_columns)
+            .combine_first(stored.set_index(key_columns))
+            .reset_index()
+        )
+        combined = combined[list(dict.fromkeys([*stored.columns, *new_wide.columns]))]
+    atomic_write_csv(combined, file_path)
+    return combined
+
+
+def _partition_dir(store_dir, company, metric):
+    return os.path.join(store_dir, f"Company={quote(company, safe='')}", f"Metric={quote(metric, safe='')}")
+
+
+def write_store(long_df, store_dir=DEFAULT_STORE_DIR):
+    """
+    Write long-format rows to a Parquet dataset partitioned by Company/Metric
+    and publish them in the store manifest
+
+    Every (Company, Metric) partition present in ``long_df`` is replaced as a
+    whole, so callers pass the complete rows of the partitions they touched.
+    Each partition is written to a hidden temporary file and renamed over
+    its data file, so readers see either its old or its new rows. The
+    manifest is updated once all partitions are in place. Returns the new
+    store version (None when there was nothing to write).
+    """
+    if long_df.empty:
+        return None
+    # Values stay float64 on disk; only the in-memory copies are narrowed
+    rows = normalize_long(long_df, compact=False)
+    written = []
+    for (company, metric), partition in rows.groupby(PARTITION_COLUMNS, observed=True, sort=False):
+        directory = _partition_dir(store_dir, company, metric)
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pandas(partition[['Date', 'Value']], preserve_index=False)
+        with atomic_write(os.path.join(directory, PARTITION_FILE), 'wb') as f:
+            pq.write_table(table, f)
+        # Data files of earlier layouts (one uuid-named file per write)
+        for name in os.listdir(directory):
+            if name != PARTITION_FILE and not name.startswith('.'):
+                os.remove(os.path.join(directory, name))
+        written.append((company, metric))
+    return publish_manifest(written, store_dir)
+
+
+def read_manifest(store_dir=DEFAULT_STORE_DIR):
+    """
+    The store manifest: ``version`` (0 before the first publish),
+    ``published_at`` and ``partitions`` ({company: {metric: version}})
+    """
+    try:
+        with open(os.path.join(store_dir, STORE_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': 0, 'published_at': None, 'partitions': {}}
+
+
+def publish_manifest(partitions, store_dir=DEFAULT_STORE_DIR):
+    """
+    Record the given (Company, Metric) partitions as changed in a new store
+    version and atomically replace the manifest. Returns the new version.
+    """
+    with _manifest_lock:
+        manifest = read_manifest(store_dir)
+        version = manifest['version'] + 1
+        for company, metric in partitions:
+            manifest['partitions'].setdefault(company, {})[metric] = version
+        manifest.update(version=version, published_at=time.time())
+        with atomic_write(os.path.join(store_dir, STORE_MANIFEST)) as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+    return version
+
+
+def store_version(store_dir=DEFAULT_STORE_DIR):
+    return read_manifest(store_dir)['version']
+
+
+def changed_partitions(store_dir=DEFAULT_STORE_DIR, since=None):
+    """
+    (Company, Metric) partitions published after version ``since``, or None
+    when the manifest cannot tell (no manifest, or ``since`` is not one of
+    its earlier versions) and the whole store has to be read
+    """
+    manifest = read_manifest(store_dir)
+    if not manifest['version'] or not isinstance(since, int) or not 0 < since <= manifest['version']:
+        return None
+    return [
+        (company, metric)
+        for company, metrics in manifest['partitions'].items()
+        for metric, version in metrics.items()
+        if version > since
+    ]
+
+
+def refresh_store(stored_rows, new_rows, store_dir=DEFAULT_STORE_DIR):
+    """
+    Rewrite the store partitions touched by ``new_rows`` from the complete
+    ``stored_rows`` (e.g. the upserted long CSV), together with the derived
+    metrics of the touched companies, recomputed over their full history
+    since growth rates look back up to a year. Returns the number of
+    partitions written.
+    """
+    touched = new_rows[PARTITION_COLUMNS].drop_duplicates()
+    company_rows = add_derived_metrics(stored_rows[stored_rows['Company'].isin(touched['Company'])])
+    rewrite = company_rows[
+        company_rows['Metric'].isin(DERIVED_METRICS)
+        | company_rows.set_index(PARTITION_COLUMNS).index.isin(touched.set_index(PARTITION_COLUMNS).index)
+    ]
+    write_store(rewrite, store_dir)
+    return len(rewrite[PARTITION_COLUMNS].drop_duplicates())
+
+
+def store_exists(store_dir=DEFAULT_STORE_DIR):
+    return os.path.isdir(store_dir) and any(name.startswith('Company=') for name in os.listdir(store_dir))
+
+
+def _partition_keys(store_dir):
+    keys = []
+    for company_dir in sorted(os.listdir(store_dir)):
+        if not company_dir.startswith('Company='):
+            continue
+        for metric_dir in sorted(os.listdir(os.path.join(store_dir, company_dir))):
+            if metric_dir.startswith('Metric='):
+                keys.append((unquote(company_dir[len('Company='):]), unquote(metric_dir[len('Metric='):])))
+    return keys
+
+
+def store_partitions(store_dir=DEFAULT_STORE_DIR):
+    """
+    List the stored (Company, Metric) partitions from the directory layout,
+    without opening any data file
+    """
+    return pd.DataFrame(_partition_keys(store_dir), columns=PARTITION_COLUMNS)
+
+
+def _discover_store(store_dir, columns, companies=None, start=None, end=None, partitions=None):
+    dataset = ds.dataset(
+        store_dir,
+        format='parquet',
+        partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+    )
+    predicate = None
+    if companies is not None:
+        predicate = ds.field('Company').isin(list(companies))
+    if partitions is not None:
+        condition = ds.scalar(False)
+        for company, metric in partitions:
+            condition = condition | ((ds.field('Company') == company) & (ds.field('Metric') == metric))
+        predicate = condition if predicate is None else predicate & condition
+    if start is not None:
+        condition = ds.field('Date') >= pd.Timestamp(start)
+        predicate = condition if predicate is None else predicate & condition
+    if end is not None:
+        condition = ds.field('Date') <= pd.Timestamp(end)
+        predicate = condition if predicate is None else predicate & condition
+    return dataset.to_table(columns=columns, filter=predicate).to_pandas()
+
+
+def read_store(store_dir=DEFAULT_STORE_DIR, columns=None, companies=None, start=None, end=None, partitions=None):
+    """
+    Read the partitioned store, or the given ``companies`` / ``partitions``
+    (a list of (Company, Metric) pairs) of it, between optional date bounds
+
+    Each partition's data file is opened directly, without Parquet dataset
+    discovery, and Company and Metric are rebuilt from the directory names
+    rather than decoded per row.
+    Full-column reads come back in the canonical schema (see
+    ``normalize_long``).
+    """
+    columns = list(columns or LONG_COLUMNS)
+    keys = _partition_keys(store_dir)
+    if companies is not None:
+        wanted = set(companies)
+        keys = [key for key in keys if key[0] in wanted]
+    if partitions is not None:
+        wanted = set(map(tuple, partitions))
+        keys = [key for key in keys if key in wanted]
+    # Date is always read: the date bounds are applied after decoding
+    file_columns = ['Date', *(['Value'] if 'Value' in columns else [])]
+    paths = [os.path.join(_partition_dir(store_dir, company, metric), PARTITION_FILE) for company, metric in keys]
+    if not all(map(os.path.exists, paths)):
+        # Stores written before PARTITION_FILE held one file per write
+        frame = _discover_store(store_dir, columns, companies, start, end, partitions)
+        return normalize_long(frame) if columns == LONG_COLUMNS else frame
+    tables = [pq.ParquetFile(path).read(columns=file_columns) for path in paths]
+
+    if not tables:
+        return normalize_long(pd.DataFrame(columns=LONG_COLUMNS))[columns]
+
+    lengths = np.array([table.num_rows for table in tables], dtype=np.int64)
+    frame = {}
+    for position, column in enumerate(PARTITION_COLUMNS):
+        codes, categories = pd.factorize(pd.Index([key[position] for key in keys]))
+        frame[column] = pd.Categorical.from_codes(np.repeat(codes, lengths), categories=categories.astype(str))
+    table = pa.concat_tables(tables)
+    frame['Date'] = table.column('Date').to_pandas().astype('datetime64[ns]').to_numpy()
+    if 'Value' in file_columns:
+        frame['Value'] = table.column('Value').to_numpy()
+    frame = pd.DataFrame(frame)
+    if start is not None or end is not None:
+        within = np.ones(len(frame), dtype=bool)
+        if start is not None:
+            within &= (frame['Date'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            within &= (frame['Date'] <= pd.Timestamp(end)).to_numpy()
+        frame = frame[within].reset_index(drop=True)
+        for column in PARTITION_COLUMNS:
+            frame[column] = frame[column].cat.remove_unused_categories()
+    if columns == LONG_COLUMNS:
+        # Partitions are written in the canonical schema; only the values
+        # are narrowed in memory
+        frame['Value'] = compact_values(frame['Value'])
+    return frame[columns]
+
+
+def build_store_from_csv(csv_path=DEFAULT_CSV_PATH, store_dir=DEFAULT_STORE_DIR):
+    """
+    (Re)build the Parquet store from the long-format CSV, with the derived
+    metrics materialized next to the base ones
+    """
+    df = add_derived_metrics(read_csv_if_exists(csv_path, LONG_COLUMNS))
+    write_store(df, store_dir)
+    return df
+
+
+if __name__ == '__main__':
+    converted = build_store_from_csv()
+    print(f"Wrote {len(converted)} rows to {DEFAULT_STORE_DIR}")
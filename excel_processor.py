@@ -1 +1,233 @@
-{"status":500,"name":"Error","message":"Input buffer contains unsupported image format"}
\ No newline at end of file
+"""
+Excel ingestion for InventoryComparison.xlsx and analyst workbooks
+
+Each sheet holds company blocks laid out side by side and on top of each
+other: a header row with the company ("WDC (Quarterly in USD)") followed by
+one period end date per column, then one row per metric. A trailing totals
+column has no date header and is ignored. Sheets are read row by row in
+openpyxl's read-only mode and the blocks are normalized into the long
+Company/Metric/Date/Value schema, then upserted into the long CSV and the
+Parquet store read by the dashboard.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from data_store import (
+    atomic_write,
+    refresh_store,
+    upsert_long_csv,
+    BASE_DIR,
+    DEFAULT_CSV_PATH,
+    DEFAULT_STORE_DIR,
+    LONG_COLUMNS,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKBOOKS = [os.path.join(BASE_DIR, 'InventoryComparison.xlsx')]
+
+# Content hashes of the workbooks already ingested
+DEFAULT_MANIFEST = os.path.join(BASE_DIR, '.cache', 'excel_manifest.json')
+
+# Metric rows taken from the blocks (helper rows such as "Revenue on Hand"
+# are skipped); None keeps every row
+EXCEL_METRICS = (
+    'Revenue', 'Cost Of Goods Sold', 'Gross Profit', 'Inventory', 'Cash On Hand', 'Inventory Turnover',
+)
+
+# "WDC (Quarterly in USD)" -> "WDC"
+BLOCK_TITLE = re.compile(r'^\s*(.+?)\s*(\(.*\))?\s*$')
+
+# Rows buffered before they are converted into a compact DataFrame chunk
+CHUNK_ROWS = 50_000
+
+
+def _block_headers(row):
+    """
+    Find the block headers in a sheet row: a text cell followed by one or
+    more date cells. Returns ``(label column, company, [(column, date), ...])``
+    """
+    headers = []
+    column = 0
+    while column < len(row):
+        value = row[column]
+        if isinstance(value, str) and value.strip():
+            dates = []
+            cursor = column + 1
+            while cursor < len(row) and isinstance(row[cursor], (datetime, date)):
+                dates.append((cursor, pd.Timestamp(row[cursor]).normalize()))
+                cursor += 1
+            if dates:
+                headers.append((column, BLOCK_TITLE.match(value).group(1), dates))
+                column = cursor
+                continue
+        column += 1
+    return headers
+
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').replace('$', ''))
+    except ValueError:
+        return None
+
+
+def iter_workbook_rows(path, metrics=EXCEL_METRICS):
+    """
+    Yield ``(company, metric, date, value)`` for every value cell of every
+    block in the workbook
+
+    Sheets are streamed row by row in read-only mode; only the headers of
+    the blocks currently open are kept, so memory does not grow with the
+    size of the workbook.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            blocks = {}
+            for row in sheet.iter_rows(values_only=True):
+                for column, company, dates in _block_headers(row):
+                    blocks[column] = (company, dates)
+
+                for column, (company, dates) in list(blocks.items()):
+                    label = row[column] if column < len(row) else None
+                    if label is None or (isinstance(label, str) and not label.strip()):
+                        # A blank label cell closes the block
+                        del blocks[column]
+                        continue
+                    if isinstance(label, (datetime, date)) or not isinstance(label, str):
+                        continue
+                    metric = label.strip()
+                    if metrics is not None and metric not in metrics:
+                        continue
+                    for cell, period in dates:
+                        value = _number(row[cell]) if cell < len(row) else None
+                        if value is not None:
+                            yield company, metric, period, value
+    finally:
+        workbook.close()
+
+
+def read_workbook(path, metrics=EXCEL_METRICS):
+    """
+    Long-format rows of one workbook, built in compact chunks
+    """
+    chunks, buffer = [], []
+    for row in iter_workbook_rows(path, metrics):
+        buffer.append(row)
+        if len(buffer) >= CHUNK_ROWS:
+            chunks.append(pd.DataFrame(buffer, columns=LONG_COLUMNS))
+            buffer = []
+    if buffer or not chunks:
+        chunks.append(pd.DataFrame(buffer, columns=LONG_COLUMNS))
+    rows = pd.concat(chunks, ignore_index=True)
+    rows['Date'] = pd.to_datetime(rows['Date'])
+    return rows
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, manifest_path):
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(directory, exist_ok=True)
+    with atomic_write(manifest_path) as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _process_workbook(path, metrics):
+    """
+    Process-pool worker: parse one workbook
+    """
+    return path, read_workbook(path, metrics)
+
+
+def ingest_workbooks(paths=None, processes=None, output_file=DEFAULT_CSV_PATH, store_dir=DEFAULT_STORE_DIR,
+                     manifest_path=DEFAULT_MANIFEST, metrics=EXCEL_METRICS, force=False):
+    """
+    Ingest every workbook whose content changed since it was last ingested
+
+    Changed workbooks are parsed in a process pool, their rows are upserted
+    into the long-format ``output_file`` and the touched partitions of the
+    store (with their derived metrics) are rewritten. Unchanged workbooks,
+    identified by the SHA-256 of their content, are skipped unless
+    ``force`` is set. Returns the ingested rows.
+    """
+    paths = list(dict.fromkeys(os.path.abspath(path) for path in (paths or DEFAULT_WORKBOOKS)))
+    manifest = load_manifest(manifest_path)
+    hashes = {path: file_hash(path) for path in paths}
+    changed = [path for path in paths if force or manifest.get(path) != hashes[path]]
+    logger.info(f"{len(changed)} of {len(paths)} workbooks changed since the last run")
+    if not changed:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+
+    if processes and processes > 1 and len(changed) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(changed))) as executor:
+            results = list(executor.map(_process_workbook, changed, [metrics] * len(changed)))
+    else:
+        results = [_process_workbook(path, metrics) for path in changed]
+
+    frames = []
+    for path, rows in results:
+        logger.info(f"Read {len(rows)} values from {os.path.basename(path)}")
+        frames.append(rows)
+    new_rows = pd.concat(frames, ignore_index=True).drop_duplicates(
+        subset=['Company', 'Metric', 'Date'], keep='last'
+    )
+
+    if not new_rows.empty:
+        stored_rows = upsert_long_csv(output_file, new_rows)
+        logger.info(f"Upserted {len(new_rows)} rows into {output_file}")
+        partitions = refresh_store(stored_rows, new_rows, store_dir)
+        logger.info(f"Rewrote {partitions} partitions of {store_dir} (including derived metrics)")
+
+    manifest.update({path: hashes[path] for path in changed})
+    save_manifest(manifest, manifest_path)
+    return new_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest quarterly comparison workbooks into the dashboard dataset")
+    parser.add_argument('workbooks', nargs='*', help="Workbooks to ingest (default: InventoryComparison.xlsx)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--output', default=DEFAULT_CSV_PATH, help="Long-format CSV to upsert into")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Parquet store to refresh")
+    parser.add_argument('--force', action='store_true', help="Re-ingest workbooks even if unchanged")
+    args = parser.parse_args()
+
+    rows = ingest_workbooks(args.workbooks or None, processes=args.processes, output_file=args.output,
+                            store_dir=args.store_dir, force=args.force)
+    print(f"Ingested {len(rows)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+HTTP helpers shared by the data automation scripts
+"""
+
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to rate limit requests to a single host
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then consume it
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CachedResponse:
+    """
+    Minimal response object returned by cached fetches
+
+    The body lives either on disk (``path``) or in memory (``body``) so large
+    payloads can be streamed straight from the cache file.
+    """
+
+    def __init__(self, status_code, path=None, body=None, from_cache=False):
+        self.status_code = status_code
+        self.path = path
+        self.body = body
+        self.from_cache = from_cache
+
+    @property
+    def content(self):
+        if self.body is None and self.path is not None:
+            with open(self.path, 'rb') as f:
+                self.body = f.read()
+        return self.body if self.body is not None else b''
+
+    def open(self):
+        """
+        Open the body as a binary file-like object
+        """
+        if self.path is not None:
+            return open(self.path, 'rb')
+        return io.BytesIO(self.content)
+
+    def json(self):
+        with self.open() as f:
+            return json.load(f)
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of upstream responses
+
+    Entries are keyed by (source, key, endpoint), expire after a per-source
+    TTL and keep the validators (ETag / Last-Modified) needed to revalidate
+    them with a conditional request. The cache is bounded by ``max_bytes``;
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_dir, ttls=None, default_ttl=86400, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(meta['size'] for _, meta in self._entries())
+
+    def _base_path(self, source, key, endpoint):
+        digest = hashlib.sha1(f"{source}\x1f{key}\x1f{endpoint}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, source, digest)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(root, name)
+                try:
+                    with open(meta_path) as f:
+                        yield meta_path[:-len('.json')], json.load(f)
+                except (OSError, ValueError):
+                    continue
+
+    def _write_meta(self, base, meta):
+        tmp_path = f"{base}.json.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, f"{base}.json")
+
+    def get(self, source, key, endpoint):
+        """
+        Return ``(body_path, meta, fresh)`` for a cached entry, or None
+        """
+        base = self._base_path(source, key, endpoint)
+        try:
+            with open(f"{base}.json") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(f"{base}.body"):
+            return None
+        ttl = self.ttls.get(source, self.default_ttl)
+        fresh = time.time() - meta['fetched_at'] < ttl
+        meta['accessed_at'] = time.time()
+        self._write_meta(base, meta)
+        return f"{base}.body", meta, fresh
+
+    def put(self, source, key, endpoint, chunks, headers=None):
+        """
+        Store a response body from an iterable of byte chunks and return its path
+        """
+        headers = headers or {}
+        base = self._base_path(source, key, endpoint)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        tmp_path = f"{base}.body.{threading.get_ident()}.tmp"
+        size = 0
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+                    size += len(chunk)
+
+        with self.lock:
+            previous = 0
+            try:
+                with open(f"{base}.json") as f:
+                    previous = json.load(f)['size']
+            except (OSError, ValueError, KeyError):
+                pass
+            os.replace(tmp_path, f"{base}.body")
+            now = time.time()
+            self._write_meta(base, {
+                'source': source,
+                'key': str(key),
+                'endpoint': endpoint,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': now,
+                'accessed_at': now,
+                'size': size,
+            })
+            self.total_bytes += size - previous
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+        return f"{base}.body"
+
+    def revalidated(self, source, key, endpoint):
+        """
+        Mark an entry as fresh again after a 304 Not Modified response
+        """
+        base = self._base_path(source, key, endpoint)
+        with open(f"{base}.json") as f:
+            meta = json.load(f)
+        meta['fetched_at'] = meta['accessed_at'] = time.time()
+        self._write_meta(base, meta)
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda item: item[1].get('accessed_at', 0))
+        self.total_bytes = sum(meta['size'] for _, meta in entries)
+        for base, meta in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            for suffix in ('.body', '.json'):
+                try:
+                    os.remove(base + suffix)
+                except OSError:
+                    pass
+            self.total_bytes -= meta['size']
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised instead of sending a request to a host whose circuit is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker
+
+    After ``failure_threshold`` consecutive failures (connection errors,
+    429s or 5xx responses) the circuit opens and requests fail fast for
+    ``reset_timeout`` seconds. Then a single trial request is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_until = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_until is None:
+                return 'closed'
+            return 'open' if time.monotonic() < self.opened_until else 'half-open'
+
+    def allow(self):
+        """
+        Whether a request may be sent now
+        """
+        with self.lock:
+            if self.opened_until is None:
+                return True
+            if time.monotonic() < self.opened_until or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_until = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_until = time.monotonic() + self.reset_timeout
+            self.trial_in_flight = False
+
+    def release(self):
+        """
+        End a request that says nothing about the host's health (e.g. a
+        redirect loop) without changing the circuit, freeing its trial slot
+        """
+        with self.lock:
+            self.trial_in_flight = False
+
+    def open_for(self, seconds):
+        """
+        Open the circuit for at least ``seconds`` (e.g. a long Retry-After)
+        """
+        with self.lock:
+            until = time.monotonic() + max(seconds, self.reset_timeout)
+            self.opened_until = max(self.opened_until or 0, until)
+            self.trial_in_flight = False
+
+
+def retry_after_seconds(response):
+    """
+    Seconds requested by a Retry-After header (delta or HTTP date), or None
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpTransport:
+    """
+    Shared HTTP transport for all upstream sources
+
+    One ``requests.Session`` with a keep-alive connection pool per host
+    sized to the fetch concurrency, default timeouts, retries of 429/5xx
+    responses and connection errors with exponential backoff and full
+    jitter (honouring Retry-After), and a circuit breaker per host so a
+    throttled or failing host is not hammered while other hosts keep
+    flowing.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, pool_size=8, timeout=(5, 30), max_retries=4, backoff_base=0.5, backoff_max=30.0,
+                 failure_threshold=5, reset_timeout=60.0, throttle=None, headers=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.throttle = throttle
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def backoff(self, attempt):
+        """
+        Full-jitter exponential backoff delay for the given retry attempt
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        """
+        GET ``url`` with retries; returns the final response
+
+        The number of retries performed is available as ``response.retries``.
+        Raises CircuitOpenError when the host's circuit is open, and the last
+        connection error when every attempt failed to connect.
+        """
+        host = urlparse(url).hostname
+        breaker = self.breaker(host)
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host}")
+            if self.throttle is not None:
+                self.throttle(host)
+
+            try:
+                response = self.session.get(url, headers=headers, stream=stream, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+
+            if response.status_code not in self.RETRY_STATUSES:
+                breaker.record_success()
+                response.retries = attempt
+                return response
+
+            breaker.record_failure()
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None and retry_after > self.backoff_max:
+                # The host asked for a longer pause than we are willing to
+                # block a worker for: stop sending it requests until then
+                breaker.open_for(retry_after)
+            if attempt >= self.max_retries or breaker.state == 'open':
+                response.retries = attempt
+                return response
+            response.close()
+            time.sleep(retry_after if retry_after is not None else self.backoff(attempt))
+            attempt += 1
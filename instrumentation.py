@@ -0,0 +1,124 @@
+"""
+Lightweight timing spans for the automator and the dashboard, exportable as
+JSON lines or Prometheus text
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+from data_store import atomic_write
+
+# Span fields exported as Prometheus labels; everything else (symbol, status,
+# ...) only goes to the JSON lines to keep label cardinality low
+PROMETHEUS_LABELS = ('stage', 'source', 'cache')
+
+
+class MetricsRecorder:
+    """
+    Thread-safe collector of timing spans
+
+    Each span is a flat dict with at least ``stage``, ``seconds`` and
+    ``timestamp``; callers can add fields (bytes, status, retries, cache
+    hit/miss, ...) to the dict yielded by ``span`` while it is open. When
+    ``jsonl_path`` is set every finished span is appended to it as one JSON
+    line.
+    """
+
+    def __init__(self, jsonl_path=None, max_spans=10000):
+        self.jsonl_path = jsonl_path
+        self.spans = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **fields):
+        record = {'stage': stage, **fields}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['timestamp'] = time.time()
+            self.add(record)
+
+    def add(self, record):
+        with self.lock:
+            self.spans.append(record)
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+    def frame(self, **filters):
+        """
+        Recorded spans as a DataFrame, optionally filtered by field values
+        """
+        with self.lock:
+            spans = [
+                span for span in self.spans
+                if all(span.get(key) == value for key, value in filters.items())
+            ]
+        return pd.DataFrame(spans)
+
+    def slowest(self, n=10, **filters):
+        """
+        Stages ranked by total time, with call counts and worst case
+        """
+        spans = self.frame(**filters)
+        if spans.empty:
+            return pd.DataFrame(columns=['stage', 'calls', 'total_seconds', 'max_seconds'])
+        return (
+            spans.groupby('stage')['seconds']
+            .agg(calls='count', total_seconds='sum', max_seconds='max')
+            .sort_values('total_seconds', ascending=False)
+            .head(n)
+            .reset_index()
+        )
+
+    def to_prometheus(self, prefix='sdc'):
+        """
+        Render span totals in the Prometheus text exposition format
+        """
+        spans = self.frame()
+        lines = [
+            f"# HELP {prefix}_span_seconds Time spent in instrumented stages",
+            f"# TYPE {prefix}_span_seconds summary",
+        ]
+        if spans.empty:
+            return '\n'.join(lines) + '\n'
+
+        labels = [label for label in PROMETHEUS_LABELS if label in spans]
+        spans[labels] = spans[labels].fillna('').astype(str)
+        if 'bytes' not in spans:
+            spans['bytes'] = 0
+        grouped = spans.groupby(labels).agg(
+            seconds=('seconds', 'sum'), count=('seconds', 'count'), bytes=('bytes', 'sum')
+        )
+        byte_lines = [
+            f"# HELP {prefix}_span_bytes_total Bytes transferred in instrumented stages",
+            f"# TYPE {prefix}_span_bytes_total counter",
+        ]
+        for key, row in grouped.iterrows():
+            key = key if isinstance(key, tuple) else (key,)
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(labels, key) if value != '')
+            lines.append(f"{prefix}_span_seconds_sum{{{label_text}}} {row['seconds']:.6f}")
+            lines.append(f"{prefix}_span_seconds_count{{{label_text}}} {int(row['count'])}")
+            if row['bytes']:
+                byte_lines.append(f"{prefix}_span_bytes_total{{{label_text}}} {int(row['bytes'])}")
+        if len(byte_lines) > 2:
+            lines.extend(byte_lines)
+        return '\n'.join(lines) + '\n'
+
+    def export_prometheus(self, file_path, prefix='sdc'):
+        """
+        Atomically write the Prometheus text to a file (e.g. for the node
+        exporter's textfile collector)
+        """
+        with atomic_write(file_path) as f:
+            f.write(self.to_prometheus(prefix))
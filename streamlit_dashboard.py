@@ -4,6 +4,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import os
+import threading
+
+from dashboard_analytics import AnalyticsEngine
+from dashboard_data import IndexedDataset
+from dashboard_exports import EXPORT_FORMATS, export_file
+from dashboard_figures import build_figure
+from data_store import add_derived_metrics, changed_partitions, read_store, store_exists, store_version
+from instrumentation import MetricsRecorder
 
 st.set_page_config(
     page_title="Semiconductor Financial Dashboard",
@@ -18,194 +27,298 @@ This dashboard analyzes financial data for semiconductor companies (WDC, Intel,
 with focus on inventory and sales metrics for internship case study presentation.
 """)
 
-# Load data
-@st.cache_data
-def load_data(file_path):
-    df = pd.read_csv(file_path)
-    df["Date"] = pd.to_datetime(df["Date"])
-    return df
+def source_mtime(file_path, store_dir):
+    """
+    Latest modification time of the dataset's source files
+    """
+    paths = [file_path] if os.path.exists(file_path) else []
+    for root, _, files in os.walk(store_dir):
+        paths.extend(os.path.join(root, name) for name in files)
+    return max((os.path.getmtime(path) for path in paths), default=0.0)
+
+def data_version(file_path, store_dir):
+    """
+    Version of the published data: the store manifest version, or the
+    sources' modification time for a CSV-only setup or an unpublished store
+    """
+    return store_version(store_dir) or source_mtime(file_path, store_dir)
+
+@st.cache_resource
+def latest_dataset():
+    """
+    The most recently loaded dataset of this process and its version,
+    shared by all sessions so a new version only reloads what changed
+    """
+    return {"version": None, "dataset": None, "lock": threading.Lock()}
 
-import os
+# Load data
+@st.cache_resource(max_entries=2)
+def load_data(file_path, store_dir, snapshot_path, version):
+    """
+    Load the long-format dataset of one data version and index it by
+    (Metric, Company, Date)
+
+    Reads the partitioned Parquet store when it exists, which already holds
+    the derived metrics (turnover, margins, growth rates). The CSV fallback
+    derives them here, once per load. The result is a single read-only
+    instance shared by every session (no per-session copy); sidebar filters
+    are positions into it and KPIs are computed on its arrays.
+
+    A newly published version is a new cache entry: when the previous
+    version is loaded, only the partitions the manifest lists as changed
+    since then are read and swapped in; sessions still rendering the
+    previous version keep using it until their next rerun.
+
+    The indexed rows are also written to an Arrow snapshot that other
+    dashboard processes memory-map instead of rebuilding, as long as it is
+    newer than the sources.
+    """
+    latest = latest_dataset()
+    with latest["lock"]:
+        if os.path.exists(snapshot_path) and os.path.getmtime(snapshot_path) >= source_mtime(file_path, store_dir):
+            dataset = IndexedDataset.from_snapshot(snapshot_path)
+        else:
+            changed = None
+            if latest["dataset"] is not None:
+                changed = changed_partitions(store_dir, since=latest["version"])
+            if changed is not None:
+                dataset = latest["dataset"].replace_partitions(read_store(store_dir, partitions=changed), changed)
+            elif store_exists(store_dir):
+                dataset = IndexedDataset(read_store(store_dir), normalized=True)
+            else:
+                df = pd.read_csv(file_path)
+                df["Date"] = pd.to_datetime(df["Date"])
+                dataset = IndexedDataset(add_derived_metrics(df))
+            dataset.write_snapshot(snapshot_path)
+        latest.update(version=version, dataset=dataset)
+    return dataset
 
 # Get path relative to script location
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 processed_file_path = os.path.join(BASE_DIR, "processed_inventory_data.csv")
+store_dir = os.path.join(BASE_DIR, "inventory_store")
+snapshot_path = os.path.join(BASE_DIR, ".cache", "dashboard_dataset.arrow")
+export_dir = os.path.join(BASE_DIR, ".cache", "exports")
+
+# Per-session timing spans; every rerun gets its own run id so the
+# performance panel can show the stages of the latest run only. Set
+# DASHBOARD_METRICS_FILE to also append the spans as JSON lines.
+if "metrics" not in st.session_state:
+    st.session_state.metrics = MetricsRecorder(jsonl_path=os.environ.get("DASHBOARD_METRICS_FILE"))
+    st.session_state.run_id = 0
+st.session_state.run_id += 1
+recorder = st.session_state.metrics
+run_id = st.session_state.run_id
+
+def span(stage, **fields):
+    return recorder.span(stage, run=run_id, **fields)
+
+
+@st.cache_resource
+def latest_engine():
+    """
+    The most recently built analytics engine of this process and its
+    version, from which the engine of the next version is derived
+    """
+    return {"version": None, "engine": None, "lock": threading.Lock()}
+
+@st.cache_resource(max_entries=2)
+def analytics_engine(file_path, store_dir, snapshot_path, version):
+    """
+    Per-metric Date x Company matrices for the focus analysis, one engine
+    per data version shared by all sessions
+
+    As in ``load_data``, a newly published version is derived from the
+    previous engine: its built matrices are kept and only the partitions
+    the manifest lists as changed are read and folded in.
+    """
+    dataset = load_data(file_path, store_dir, snapshot_path, version)
+    latest = latest_engine()
+    with latest["lock"]:
+        changed = None
+        if latest["engine"] is not None:
+            if latest["version"] == version:
+                return latest["engine"]
+            changed = changed_partitions(store_dir, since=latest["version"])
+        if changed is not None:
+            engine = latest["engine"].replace_partitions(dataset, read_store(store_dir, partitions=changed), changed)
+        else:
+            engine = AnalyticsEngine(dataset)
+        latest.update(version=version, engine=engine)
+    return engine
+
+with span("load"):
+    dataset_version = data_version(processed_file_path, store_dir)
+    dataset = load_data(processed_file_path, store_dir, snapshot_path, dataset_version)
+    analytics = analytics_engine(processed_file_path, store_dir, snapshot_path, dataset_version)
 
+# Seconds between checks for newly published data
+RELOAD_POLL_SECONDS = 60
 
-df = load_data(processed_file_path)
+@st.fragment(run_every=RELOAD_POLL_SECONDS)
+def watch_for_updates(loaded_version):
+    # Reading the manifest is cheap; the full rerun happens only when the
+    # scheduler (or the Excel ingestion) published a new version
+    if data_version(processed_file_path, store_dir) != loaded_version:
+        st.rerun()
+
+watch_for_updates(dataset_version)
 
 # Sidebar Filters
 st.sidebar.header("🔍 Filters")
 
-companies = df["Company"].unique()
+companies = dataset.companies
 selected_companies = st.sidebar.multiselect(
     "Select Companies", 
     companies, 
-    default=companies.tolist(),
+    default=companies,
     help="Choose which companies to include in the analysis"
 )
 
-df_filtered = df[df["Company"].isin(selected_companies)]
-
 # Date Range Filter
-min_date = df_filtered["Date"].min()
-max_date = df_filtered["Date"].max()
+min_date, max_date = dataset.date_bounds(selected_companies)
 
 date_range = st.sidebar.date_input(
     "Select Date Range", 
     value=(min_date, max_date), 
     min_value=min_date, 
     max_value=max_date,
-    help="Filter data by date range"
+    help="Filter data by date range; long series are downsampled, so narrowing the range shows more detail"
 )
 
-if len(date_range) == 2:
-    df_filtered = df_filtered[
-        (df_filtered["Date"] >= pd.Timestamp(date_range[0])) & 
-        (df_filtered["Date"] <= pd.Timestamp(date_range[1]))
-    ]
+start_date, end_date = (date_range if len(date_range) == 2 else (None, None))
+
+def summarize_rows(metrics):
+    """
+    Statistics of the given metric(s) within the current company and date
+    filters, computed on the shared dataset without copying rows
+    """
+    return dataset.summarize(metrics, selected_companies, start_date, end_date)
+
+with span("filter"):
+    # Positions into the shared dataset; rows are only materialized where
+    # they are displayed or exported
+    filtered_positions = dataset.positions(None, selected_companies, start_date, end_date)
 
 # Metric selector
-metrics = df["Metric"].unique()
+metrics = dataset.metrics
 selected_metric = st.sidebar.selectbox(
     "Focus Metric for Analysis",
     metrics,
-    index=0,
+    index=metrics.index("Revenue") if "Revenue" in metrics else 0,
     help="Select a metric to highlight in detailed analysis"
 )
 
-# Ensure 'Value' column is numeric
-df_filtered["Value"] = pd.to_numeric(df_filtered["Value"], errors="coerce")
-
 # Key Metrics Section
 st.header("Key Metrics Overview")
 
 col1, col2, col3, col4 = st.columns(4)
 
-# Calculate metrics
-inventory_df = df_filtered[df_filtered["Metric"] == "Inventory"]
-revenue_df = df_filtered[df_filtered["Metric"] == "Revenue"]
-cogs_df = df_filtered[df_filtered["Metric"] == "Cost Of Goods Sold"]
-cash_df = df_filtered[df_filtered["Metric"] == "Cash On Hand"]
+with span("aggregate"):
+    # Calculate metrics
+    inventory_stats = summarize_rows("Inventory")
+    revenue_stats = summarize_rows("Revenue")
+    turnover_stats = summarize_rows("Inventory Turnover")
+    cash_stats = summarize_rows("Cash On Hand")
 
-# Average calculations
-avg_inventory = inventory_df["Value"].mean() if not inventory_df.empty else 0
-avg_revenue = revenue_df["Value"].mean() if not revenue_df.empty else 0
-avg_cogs = cogs_df["Value"].mean() if not cogs_df.empty else 0
-avg_cash = cash_df["Value"].mean() if not cash_df.empty else 0
+    # Average calculations
+    avg_inventory = inventory_stats["mean"] if inventory_stats["count"] else 0
+    avg_revenue = revenue_stats["mean"] if revenue_stats["count"] else 0
+    avg_cash = cash_stats["mean"] if cash_stats["count"] else 0
 
-# Inventory Turnover calculation
-inventory_turnover = avg_cogs / avg_inventory if (avg_cogs and avg_inventory and avg_inventory != 0) else 0
+    # Inventory Turnover is materialized per quarter at ingest
+    inventory_turnover = turnover_stats["mean"] if turnover_stats["count"] else 0
 
 with col1:
     st.metric(
         label="Average Inventory", 
         value=f"${avg_inventory:,.0f}M" if avg_inventory else "N/A",
-        delta=f"{len(inventory_df)} data points"
+        delta=f"{inventory_stats['count']} data points"
     )
 with col2:
     st.metric(
         label="Average Revenue", 
         value=f"${avg_revenue:,.0f}M" if avg_revenue else "N/A",
-        delta=f"{len(revenue_df)} data points"
+        delta=f"{revenue_stats['count']} data points"
     )
 with col3:
     st.metric(
         label="Inventory Turnover", 
         value=f"{inventory_turnover:.2f}" if inventory_turnover else "N/A",
-        delta="COGS/Inventory ratio"
+        delta="Avg quarterly COGS/Inventory"
     )
 with col4:
     st.metric(
         label="Average Cash", 
         value=f"${avg_cash:,.0f}M" if avg_cash else "N/A",
-        delta=f"{len(cash_df)} data points"
+        delta=f"{cash_stats['count']} data points"
     )
 
 # Financial Analysis Section
 st.header("Financial Analysis")
 
-# Create tabs for different analyses
-tab1, tab2, tab3 = st.tabs(["Trends", "Comparisons", "Detailed Metrics"])
+# Figures of every session's selections; bounded so filter combinations
+# and superseded data versions do not accumulate for the process lifetime
+@st.cache_data(show_spinner=False, max_entries=256, ttl=3600)
+def cached_figure(name, metrics, companies, start, end, version, _dataset):
+    """
+    Build one figure for a (metric, companies, date range) selection,
+    memoized so unchanged charts are not rebuilt on reruns
+    """
+    rows = _dataset.select(metrics, list(companies), start, end)
+    if rows.empty:
+        return None
+    metric = metrics if isinstance(metrics, str) else None
+    return build_figure(name, rows, metric)
+
+def figure(name, metrics, selection):
+    # Cache hits show up as near-zero figure_build spans
+    with span("figure_build", figure=name):
+        return cached_figure(name, metrics, *selection, dataset_version, dataset)
+
+def render(fig, name):
+    with span("render", figure=name):
+        st.plotly_chart(fig, use_container_width=True)
+
+def show_figure(name, metrics, selection, missing_message):
+    fig = figure(name, metrics, selection)
+    if fig is not None:
+        render(fig, name)
+    else:
+        st.warning(missing_message)
 
-with tab1:
+# Each tab is a fragment, so interacting with a widget inside one tab only
+# reruns that tab; the selection is passed in from the last full run
+@st.fragment
+def trends_tab(selection):
     st.subheader("Revenue and Inventory Trends Over Time")
     
     # Revenue Over Time
-    if not revenue_df.empty:
-        fig_revenue = px.line(
-            revenue_df, 
-            x="Date", 
-            y="Value", 
-            color="Company", 
-            title="Revenue Over Time (in USD)",
-            markers=True
-        )
-        fig_revenue.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Revenue (USD)",
-            hovermode='x unified'
-        )
-        st.plotly_chart(fig_revenue, use_container_width=True)
-    else:
-        st.warning("No revenue data available for selected filters.")
+    show_figure("revenue_trend", "Revenue", selection,
+                "No revenue data available for selected filters.")
 
     # Inventory Over Time
-    if not inventory_df.empty:
-        fig_inventory = px.line(
-            inventory_df, 
-            x="Date", 
-            y="Value", 
-            color="Company", 
-            title="Inventory Over Time (in USD)",
-            markers=True
-        )
-        fig_inventory.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Inventory (USD)",
-            hovermode='x unified'
-        )
-        st.plotly_chart(fig_inventory, use_container_width=True)
-    else:
-        st.warning("No inventory data available for selected filters.")
+    show_figure("inventory_trend", "Inventory", selection,
+                "No inventory data available for selected filters.")
 
-with tab2:
+@st.fragment
+def comparisons_tab(selection, selected_metric):
     st.subheader("Company Comparisons")
     
     # Company comparison by selected metric
-    metric_df = df_filtered[df_filtered["Metric"] == selected_metric]
-    if not metric_df.empty:
+    fig_comparison = figure("average_by_company", selected_metric, selection)
+    if fig_comparison is not None:
         # Bar chart comparison
-        avg_by_company = metric_df.groupby("Company")["Value"].mean().reset_index()
-        fig_comparison = px.bar(
-            avg_by_company,
-            x="Company",
-            y="Value",
-            title=f"Average {selected_metric} by Company",
-            color="Company"
-        )
-        fig_comparison.update_layout(
-            xaxis_title="Company",
-            yaxis_title=f"{selected_metric} (USD)"
-        )
-        st.plotly_chart(fig_comparison, use_container_width=True)
+        render(fig_comparison, "average_by_company")
         
         # Box plot for distribution
-        fig_box = px.box(
-            metric_df,
-            x="Company",
-            y="Value",
-            title=f"{selected_metric} Distribution by Company"
-        )
-        fig_box.update_layout(
-            xaxis_title="Company",
-            yaxis_title=f"{selected_metric} (USD)"
-        )
-        st.plotly_chart(fig_box, use_container_width=True)
+        fig_box = figure("distribution_by_company", selected_metric, selection)
+        render(fig_box, "distribution_by_company")
     else:
         st.warning(f"No data available for {selected_metric} with current filters.")
 
-with tab3:
+@st.fragment
+def detailed_metrics_tab(selection):
     st.subheader("Detailed Financial Metrics")
     
     # Multi-metric comparison
@@ -213,155 +326,166 @@ with tab3:
     
     with col1:
         # Cost of Goods Sold vs Gross Profit
-        cogs_gp_df = df_filtered[df_filtered["Metric"].isin(["Cost Of Goods Sold", "Gross Profit"])]
-        if not cogs_gp_df.empty:
-            fig_cogs_gp = px.bar(
-                cogs_gp_df, 
-                x="Date", 
-                y="Value", 
-                color="Metric", 
-                facet_col="Company",
-                title="Cost of Goods Sold vs Gross Profit",
-                barmode="group"
-            )
-            fig_cogs_gp.update_layout(height=400)
-            st.plotly_chart(fig_cogs_gp, use_container_width=True)
-        else:
-            st.warning("No COGS/Gross Profit data available.")
+        show_figure("cogs_vs_gross_profit", ("Cost Of Goods Sold", "Gross Profit"), selection,
+                    "No COGS/Gross Profit data available.")
     
     with col2:
         # Cash on Hand Over Time
-        if not cash_df.empty:
-            fig_cash = px.line(
-                cash_df, 
-                x="Date", 
-                y="Value", 
-                color="Company", 
-                title="Cash On Hand Over Time",
+        show_figure("cash_trend", "Cash On Hand", selection,
+                    "No cash data available.")
+
+    # Inventory Turnover Analysis
+    show_figure("turnover_scatter", "Inventory Turnover", selection,
+                "No inventory turnover data available.")
+
+@st.cache_data(show_spinner=False, max_entries=64, ttl=3600)
+def mean_rolling_correlation(metric, companies, start, end, window, version, _analytics):
+    """
+    Average pairwise correlation between the companies over a rolling window
+    """
+    dates, matrices = _analytics.rolling_correlation(metric, window, list(companies), start, end)
+    off_diagonal = ~np.eye(matrices.shape[1], dtype=bool)
+    with np.errstate(all="ignore"):
+        values = [np.nanmean(matrix[off_diagonal]) if np.isfinite(matrix[off_diagonal]).any() else np.nan
+                  for matrix in matrices]
+    return pd.DataFrame({"Date": dates, "Correlation": values}).dropna()
+
+@st.fragment
+def focus_tab(selection, selected_metric):
+    st.subheader(f"Focus Analysis: {selected_metric}")
+    companies, start, end = selection
+
+    with span("aggregate", section="focus"):
+        summary_stats = analytics.summary(selected_metric, list(companies), start, end)
+    if summary_stats.empty or not summary_stats["count"].any():
+        st.warning(f"No data available for {selected_metric}.")
+        return
+
+    # Summary statistics
+    st.write("**Summary Statistics:**")
+    st.dataframe(summary_stats.round(2))
+
+    # Correlation analysis if multiple companies
+    if len(companies) > 1:
+        st.write("**Correlation Analysis:**")
+        with span("figure_build", figure="correlation"):
+            correlation_matrix = analytics.correlation(selected_metric, list(companies), start, end)
+            fig_corr = px.imshow(
+                correlation_matrix,
+                title=f"{selected_metric} Correlation Matrix",
+                color_continuous_scale="RdBu",
+                zmin=-1,
+                zmax=1,
+                aspect="auto"
+            )
+        render(fig_corr, "correlation")
+
+        window = st.slider("Rolling correlation window (quarters)", min_value=4, max_value=12, value=8)
+        with span("figure_build", figure="rolling_correlation"):
+            rolling = mean_rolling_correlation(selected_metric, companies, start, end, window, dataset_version, analytics)
+        if not rolling.empty:
+            fig_rolling = px.line(
+                rolling,
+                x="Date",
+                y="Correlation",
+                title=f"Average {selected_metric} Correlation Between Companies ({window}-Quarter Rolling)",
                 markers=True
             )
-            fig_cash.update_layout(height=400)
-            st.plotly_chart(fig_cash, use_container_width=True)
-        else:
-            st.warning("No cash data available.")
+            fig_rolling.update_yaxes(range=[-1, 1])
+            render(fig_rolling, "rolling_correlation")
 
-    # Inventory Turnover Analysis
-    turnover_df = df_filtered[df_filtered["Metric"] == "Inventory Turnover"]
-    if not turnover_df.empty:
-        fig_turnover = px.scatter(
-            turnover_df,
-            x="Date",
-            y="Value",
-            color="Company",
-            size="Value",
-            title="Inventory Turnover Ratio Over Time",
-            hover_data=["Company", "Date", "Value"]
-        )
-        fig_turnover.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Inventory Turnover Ratio"
-        )
-        st.plotly_chart(fig_turnover, use_container_width=True)
-    else:
-        st.warning("No inventory turnover data available.")
+    # Growth rate analysis (materialized at ingest)
+    growth_metric = f"{selected_metric} QoQ Growth"
+    if growth_metric in dataset.metrics:
+        st.write("**Quarter-over-Quarter Growth Rates:**")
+        show_figure("qoq_growth", growth_metric, selection,
+                    f"Not enough consecutive quarters to compute {selected_metric} growth.")
 
-# with tab4:
-#     st.subheader(f"Focus Analysis: {selected_metric}")
-    
-#     focus_df = df_filtered[df_filtered["Metric"] == selected_metric]
-#     if not focus_df.empty:
-#         # Summary statistics
-#         st.write("**Summary Statistics:**")
-#         summary_stats = focus_df.groupby("Company")["Value"].agg([
-#             'count', 'mean', 'median', 'std', 'min', 'max'
-#         ]).round(2)
-#         st.dataframe(summary_stats)
-        
-#         # Correlation analysis if multiple companies
-#         if len(selected_companies) > 1:
-#             st.write("**Correlation Analysis:**")
-#             pivot_df = focus_df.pivot_table(
-#                 index="Date", 
-#                 columns="Company", 
-#                 values="Value"
-#             )
-#             correlation_matrix = pivot_df.corr()
-            
-#             fig_corr = px.imshow(
-#                 correlation_matrix,
-#                 title=f"{selected_metric} Correlation Matrix",
-#                 color_continuous_scale="RdBu",
-#                 aspect="auto"
-#             )
-#             st.plotly_chart(fig_corr, use_container_width=True)
-        
-#         # Growth rate analysis
-#         st.write("**Quarter-over-Quarter Growth Rates:**")
-#         growth_data = []
-#         for company in selected_companies:
-#             company_data = focus_df[focus_df["Company"] == company].sort_values("Date")
-#             if len(company_data) > 1:
-#                 company_data["Growth_Rate"] = company_data["Value"].pct_change() * 100
-#                 growth_data.append(company_data)
-        
-#         if growth_data:
-#             growth_df = pd.concat(growth_data)
-#             growth_df = growth_df.dropna(subset=["Growth_Rate"])
-            
-#             if not growth_df.empty:
-#                 fig_growth = px.bar(
-#                     growth_df,
-#                     x="Date",
-#                     y="Growth_Rate",
-#                     color="Company",
-#                     title=f"{selected_metric} Quarter-over-Quarter Growth Rate (%)",
-#                     barmode="group"
-#                 )
-#                 fig_growth.update_layout(
-#                     xaxis_title="Date",
-#                     yaxis_title="Growth Rate (%)"
-#                 )
-#                 st.plotly_chart(fig_growth, use_container_width=True)
-#     else:
-#         st.warning(f"No data available for {selected_metric}.")
+# Create tabs for different analyses
+tab1, tab2, tab3, tab4 = st.tabs(["Trends", "Comparisons", "Detailed Metrics", "Focus Analysis"])
+selection = (tuple(selected_companies), start_date, end_date)
+
+with tab1:
+    trends_tab(selection)
+
+with tab2:
+    comparisons_tab(selection, selected_metric)
+
+with tab3:
+    detailed_metrics_tab(selection)
+
+with tab4:
+    focus_tab(selection, selected_metric)
 
 # Raw Data Section
-st.header("Raw Data")
-st.write(f"Showing {len(df_filtered)} records")
-
-# Add search functionality
-search_term = st.text_input("Search in data:", placeholder="Enter company name, metric, or value...")
-if search_term:
-    mask = df_filtered.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-    df_display = df_filtered[mask]
-else:
-    df_display = df_filtered
-
-st.dataframe(
-    df_display,
-    use_container_width=True,
-    hide_index=True
-)
+@st.fragment
+def raw_data_section(positions):
+    st.header("Raw Data")
+    st.write(f"Showing {len(positions)} records")
+
+    # Add search functionality (typing here only reruns this section)
+    search_term = st.text_input("Search in data:", placeholder="Enter company name, metric, or value...")
+    if search_term:
+        with span("filter", section="search"):
+            df_display = dataset.search(search_term, positions=positions)
+    else:
+        df_display = dataset.take(positions)
+
+    with span("render", section="raw_data"):
+        st.dataframe(
+            df_display,
+            use_container_width=True,
+            hide_index=True
+        )
+
+raw_data_section(filtered_positions)
 
 # Download section
 st.header("Download Data")
 col1, col2 = st.columns(2)
 
-with col1:
-    csv = df_filtered.to_csv(index=False)
+@st.fragment
+def export_controls(selection):
+    # Nothing is serialized until the button is clicked: the callable runs
+    # on a separate thread, and the file is cached per data version and filters
+    export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+    wide = st.checkbox("Wide layout (one column per metric)", key="export_wide")
+    extension, mime = EXPORT_FORMATS[export_format]
+    companies, start, end = selection
+
+    def export():
+        with span("export", format=export_format, wide=wide):
+            path = export_file(dataset, export_format, companies, start, end, wide=wide,
+                               cache_dir=export_dir, version=dataset_version)
+        with open(path, "rb") as f:
+            return f.read()
+
     st.download_button(
-        label="Download Filtered Data as CSV",
-        data=csv,
-        file_name=f"semiconductor_data_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
-        mime="text/csv"
+        label=f"Download Filtered Data as {export_format}",
+        data=export,
+        file_name=f"semiconductor_data_{pd.Timestamp.now().strftime('%Y%m%d')}.{extension}",
+        mime=mime,
+        on_click="ignore"
     )
 
+with col1:
+    export_controls(selection)
+
 with col2:
     st.info("""
     **Data Source:** Macrotrends   
     **Dashboard for:** Sandisk Internship (Case Study Presentation)  
     **Last Updated:** """ + pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'))
 
+# Performance panel: slowest stages of this run (fragment reruns add to
+# the run they were triggered from)
+if st.sidebar.checkbox("Show performance panel", value=False,
+                       help="Timings of load, filter, aggregate, figure build and render for the last rerun"):
+    st.sidebar.subheader("⏱️ Slowest Stages")
+    st.sidebar.dataframe(recorder.slowest(run=run_id), hide_index=True)
+    with st.sidebar.expander("Prometheus metrics (session totals)"):
+        st.code(recorder.to_prometheus(prefix="sdc_dashboard"), language="text")
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,68 @@
+"""
+Tests for deriving the analytics engine of a new data version
+"""
+
+import numpy as np
+import pandas as pd
+
+from dashboard_analytics import AnalyticsEngine
+from dashboard_data import IndexedDataset
+
+
+def long_rows(values):
+    dates = pd.date_range('2023-03-31', periods=4, freq='QE')
+    return pd.DataFrame(
+        [
+            {'Company': company, 'Metric': metric, 'Date': date, 'Value': value}
+            for (company, metric), series in values.items()
+            for date, value in zip(dates, series)
+            if value is not None
+        ]
+    )
+
+
+def test_replace_partitions_matches_a_fresh_engine():
+    old = long_rows({
+        ('WDC', 'Inventory'): [3, 4, 5, 6],
+        ('MU', 'Inventory'): [8, 6, 7, 9],
+        ('INTC', 'Inventory'): [1, 2, 2, 4],
+        ('WDC', 'Revenue'): [10, 11, 12, 13],
+        ('MU', 'Revenue'): [5, 9, 7, 8],
+    })
+    rows = long_rows({('WDC', 'Inventory'): [None, 40, 1, 60]})
+    engine = AnalyticsEngine(IndexedDataset(old))
+    engine.matrix('Inventory')
+    engine.matrix('Revenue')
+    before = engine.summary('Inventory')
+
+    dataset = engine.dataset.replace_partitions(rows, [('WDC', 'Inventory')])
+    derived = engine.replace_partitions(dataset, rows, [('WDC', 'Inventory')])
+    fresh = AnalyticsEngine(dataset)
+
+    for metric in ('Inventory', 'Revenue'):
+        summary = derived.summary(metric)
+        assert np.allclose(summary, fresh.summary(metric).loc[summary.index], equal_nan=True)
+        corr = derived.correlation(metric)
+        assert np.allclose(corr, fresh.correlation(metric).loc[corr.index, corr.columns], equal_nan=True)
+    assert derived.matrix('Revenue') is engine.matrix('Revenue')
+    assert engine.summary('Inventory').equals(before)
+
+
+def test_replace_partitions_adds_a_column_for_new_companies():
+    old = long_rows({
+        ('WDC', 'Inventory'): [3, 4, 5, 6],
+        ('MU', 'Inventory'): [8, 6, 7, 9],
+        ('WDC', 'Revenue'): [10, 11, 12, 13],
+    })
+    rows = long_rows({('SNDK', 'Revenue'): [1, 2, 3, 4]})
+    engine = AnalyticsEngine(IndexedDataset(old))
+    engine.summary('Inventory')
+    shared = engine.matrix('Inventory')
+
+    dataset = engine.dataset.replace_partitions(rows, [('SNDK', 'Revenue')])
+    derived = engine.replace_partitions(dataset, rows, [('SNDK', 'Revenue')])
+
+    dates, matrices = derived.rolling_correlation('Inventory', 2, dataset.companies)
+    assert matrices.shape == (3, 3, 3)
+    assert derived.summary('Inventory').loc['SNDK', 'count'] == 0
+    assert 'SNDK' not in shared.positions
@@ -0,0 +1,37 @@
+"""
+Tests for the chunked file exports of the dashboard
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from dashboard_data import IndexedDataset
+from dashboard_exports import export_file
+from data_store import LONG_COLUMNS
+
+
+def dataset():
+    return IndexedDataset(pd.DataFrame({
+        'Company': ['WDC', 'WDC', 'MU'],
+        'Metric': ['Revenue', 'Inventory', 'Revenue'],
+        'Date': pd.to_datetime(['2024-03-31'] * 3),
+        'Value': [1.0, 2.0, 3.0],
+    }))
+
+
+def test_exports_of_an_empty_selection_keep_their_header(tmp_path):
+    long_csv = export_file(dataset(), 'CSV', [], cache_dir=str(tmp_path))
+    assert open(long_csv).read().strip() == ','.join(LONG_COLUMNS)
+
+    wide_csv = export_file(dataset(), 'CSV', ['WDC'], start='2030-01-01', wide=True, cache_dir=str(tmp_path))
+    assert open(wide_csv).read().strip() == 'Company,Date,Revenue,Inventory'
+
+    parquet = export_file(dataset(), 'Parquet', [], cache_dir=str(tmp_path))
+    assert pq.read_table(parquet).column_names == LONG_COLUMNS
+
+
+def test_csv_export_writes_the_header_once(tmp_path):
+    path = export_file(dataset(), 'CSV', ['WDC', 'MU'], cache_dir=str(tmp_path))
+    exported = pd.read_csv(path)
+    assert list(exported.columns) == LONG_COLUMNS
+    assert len(exported) == 3
@@ -0,0 +1,134 @@
+"""
+Tests for the Macrotrends extraction and the source merge of the automator
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from data_automation_script import (
+    YAHOO_COLUMNS,
+    FinancialDataAutomator,
+    _facts_to_long,
+    _merge_sources,
+    extract_macrotrends_rows,
+)
+from data_store import to_wide_format
+
+METRICS = ('Revenue', 'Cost Of Goods Sold', 'Gross Profit')
+
+
+def macrotrends_page(records):
+    return f"<html><script>var originalData = {json.dumps(records)};</script></html>".encode('utf-8')
+
+
+def test_extract_skips_blank_cells_and_strips_formatting():
+    page = macrotrends_page([
+        {'field_name': "<a href='/x'>Revenue</a>", 'popup_icon': '', '2024-05-31': '$1,234.50', '2024-02-29': ''},
+        {'field_name': 'Gross Profit', 'popup_icon': '', '2024-05-31': '400.25', '2024-02-29': '380'},
+        {'field_name': 'Operating Income', 'popup_icon': '', '2024-05-31': '99', '2024-02-29': '98'},
+    ])
+    rows = extract_macrotrends_rows(page, METRICS)
+
+    assert rows['Value'].notna().all()
+    values = rows.set_index(['Metric', 'Date'])['Value']
+    assert values[('Revenue', pd.Timestamp('2024-05-31'))] == 1234.5
+    assert ('Revenue', pd.Timestamp('2024-02-29')) not in values.index
+    assert values[('Gross Profit', pd.Timestamp('2024-02-29'))] == 380
+    assert 'Operating Income' not in set(rows['Metric'])
+
+
+def test_extract_html_table_fallback():
+    page = (
+        b"<html><table><tr><th>Item</th><th>2024-05-31</th></tr>"
+        b"<tr><td>Revenue</td><td>$2,000</td></tr></table></html>"
+    )
+    rows = extract_macrotrends_rows(page, METRICS)
+    assert rows[['Metric', 'Value']].values.tolist() == [['Revenue', 2000.0]]
+
+
+def test_merge_does_not_let_missing_values_shadow_later_sources():
+    date = pd.Timestamp('2024-02-29')
+    macrotrends = pd.DataFrame({'Company': ['MU'], 'Metric': ['Revenue'], 'Date': [date], 'Value': [float('nan')]})
+    yahoo = pd.DataFrame({'Company': ['MU'], 'Metric': ['Revenue'], 'Date': [date], 'Value': [5824.0]})
+    merged = _merge_sources([macrotrends, yahoo])
+    assert merged.loc[0, 'Revenue'] == 5824.0
+
+
+def test_shard_automators_keep_universe_ciks(tmp_path):
+    universe = tmp_path / 'universe.csv'
+    universe.write_text("Symbol,Name,CIK\nSNDK,Sandisk Corporation,2023554\n")
+    automator = FinancialDataAutomator(universe=str(universe), cache_dir=str(tmp_path / 'cache'))
+    shard = FinancialDataAutomator(companies=automator.companies, **automator.options)
+    assert shard.ciks['SNDK'] == 2023554
+
+
+def test_higher_precedence_source_restates_a_published_quarter(tmp_path):
+    date = pd.Timestamp('2024-03-31')
+    reported = {'yahoo': 100.0, 'macrotrends': None}
+
+    def rows(source):
+        value = reported[source]
+        if value is None:
+            return pd.DataFrame(columns=['Company', 'Metric', 'Date', 'Value'])
+        return pd.DataFrame({'Company': ['MU'], 'Metric': ['Revenue'], 'Date': [date], 'Value': [value]})
+
+    automator = FinancialDataAutomator(companies={'MU': 'Micron'}, cache_dir=str(tmp_path / 'cache'))
+    automator.get_yahoo_finance_data = lambda symbol: to_wide_format(rows('yahoo'), columns=YAHOO_COLUMNS)
+    automator.scrape_macrotrends_data = lambda symbol: rows('macrotrends')
+    outputs = {
+        'output_file': str(tmp_path / 'wide.csv'),
+        'long_output_file': str(tmp_path / 'long.csv'),
+        'store_dir': str(tmp_path / 'store'),
+    }
+
+    def published_revenue():
+        stored = pd.read_csv(outputs['long_output_file'])
+        return stored.loc[stored['Metric'] == 'Revenue', 'Value'].tolist()
+
+    automator.automated_data_collection(sources=('yahoo',), **outputs)
+    assert published_revenue() == [100.0]
+
+    reported['macrotrends'] = 110.0
+    automator.automated_data_collection(sources=('macrotrends',), **outputs)
+    assert published_revenue() == [110.0]
+
+    reported['yahoo'] = 105.0
+    automator.automated_data_collection(sources=('yahoo',), **outputs)
+    assert published_revenue() == [110.0]
+    assert pd.read_csv(outputs['output_file'])['Revenue'].tolist() == [110.0]
+
+
+def test_sec_period_ends_are_keyed_by_month_end():
+    facts = pd.DataFrame({
+        'Company': ['WDC', 'MU', 'INTC', 'INTC'],
+        'Concept': ['Revenues'] * 4,
+        'Date': ['2025-03-28', '2024-08-29', '2024-01-01', '2023-09-30'],
+        'Value': [1e9, 2e9, 3e9, 4e9],
+    })
+    rows = _facts_to_long(facts, {'Revenues': 'Revenue'})
+    assert set(zip(rows['Company'], rows['Date'].dt.strftime('%Y-%m-%d'))) == {
+        ('WDC', '2025-03-31'), ('MU', '2024-08-31'), ('INTC', '2023-12-31'), ('INTC', '2023-09-30'),
+    }
+
+
+def test_current_tickers_are_not_fetched(tmp_path):
+    quarter_end = pd.Timestamp.today().normalize() - pd.offsets.QuarterEnd(1)
+    stored = pd.DataFrame({
+        'Company': ['MU', 'MU', 'WDC'],
+        'Metric': ['Revenue', 'Inventory', 'Revenue'],
+        'Date': [quarter_end, quarter_end, quarter_end - pd.offsets.QuarterEnd(2)],
+        'Value': [1.0, 2.0, 3.0],
+    })
+    output_file = tmp_path / 'wide.csv'
+    to_wide_format(stored, columns=YAHOO_COLUMNS).to_csv(output_file, index=False)
+    assert FinancialDataAutomator._stale_symbols(stored, ['MU', 'WDC', 'STX']) == {'WDC', 'STX'}
+
+    automator = FinancialDataAutomator(companies={'MU': 'Micron'}, cache_dir=str(tmp_path / 'cache'))
+    automator.collect = lambda *args, **kwargs: pytest.fail("a current ticker was fetched")
+    result = automator.automated_data_collection(
+        sources=('yahoo',), output_file=str(output_file), long_output_file=str(tmp_path / 'long.csv'),
+        store_dir=str(tmp_path / 'store'),
+    )
+    assert result.empty and list(result.columns) == YAHOO_COLUMNS
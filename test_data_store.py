@@ -0,0 +1,62 @@
+"""
+Tests for reading the Company/Metric-partitioned Parquet store
+"""
+
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_store import PARTITION_FILE, normalize_long, read_store, write_store
+
+
+def long_rows():
+    dates = pd.date_range('2023-03-31', periods=4, freq='QE')
+    return pd.DataFrame(
+        [
+            {'Company': company, 'Metric': metric, 'Date': date, 'Value': value + offset}
+            for company, offset in (('WDC', 0.5), ('Sand/Disk', 10.25))
+            for metric in ('Inventory', 'Revenue')
+            for value, date in enumerate(dates)
+        ]
+    )
+
+
+def sorted_rows(df):
+    return (
+        df.astype({'Company': str, 'Metric': str})
+        .sort_values(['Company', 'Metric', 'Date'])
+        .reset_index(drop=True)
+    )
+
+
+def test_read_store_returns_the_written_rows(tmp_path):
+    rows = long_rows()
+    write_store(rows, str(tmp_path))
+
+    stored = read_store(str(tmp_path))
+    expected = normalize_long(rows)
+    assert stored.dtypes.to_dict() == expected.dtypes.to_dict()
+    pd.testing.assert_frame_equal(sorted_rows(stored), sorted_rows(expected))
+
+    selected = read_store(str(tmp_path), companies=['Sand/Disk'], start='2023-06-01', end='2023-09-30')
+    assert set(selected['Company']) == {'Sand/Disk'}
+    assert selected['Date'].tolist() == [pd.Timestamp('2023-06-30'), pd.Timestamp('2023-09-30')] * 2
+    assert list(selected['Company'].cat.categories) == ['Sand/Disk']
+
+    partition = read_store(str(tmp_path), partitions=[('WDC', 'Revenue')])
+    assert partition['Value'].tolist() == [0.5, 1.5, 2.5, 3.5]
+    assert read_store(str(tmp_path), partitions=[]).empty
+
+
+def test_read_store_falls_back_to_discovery_for_the_legacy_layout(tmp_path):
+    rows = long_rows()
+    write_store(rows, str(tmp_path))
+    # One uuid-named data file per partition, as written before PARTITION_FILE
+    for directory, _, names in os.walk(tmp_path):
+        if PARTITION_FILE in names:
+            table = pq.read_table(os.path.join(directory, PARTITION_FILE))
+            os.remove(os.path.join(directory, PARTITION_FILE))
+            pq.write_table(table, os.path.join(directory, 'legacy-0.parquet'))
+
+    pd.testing.assert_frame_equal(sorted_rows(read_store(str(tmp_path))), sorted_rows(normalize_long(rows)))
@@ -0,0 +1,114 @@
+"""
+Tests for the retrying HTTP transport and its per-host circuit breaker
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_utils import CircuitBreaker, CircuitOpenError, HttpTransport, retry_after_seconds
+
+
+class Handler(BaseHTTPRequestHandler):
+    # path -> list of (status, headers) answered in turn; the last one repeats
+    script = {}
+    hits = {}
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        answers = Handler.script[self.path]
+        status, headers = answers[min(Handler.hits[self.path], len(answers)) - 1]
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.script, Handler.hits = {}, {}
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def transport(**options):
+    return HttpTransport(**{'max_retries': 3, 'backoff_base': 0.001, 'backoff_max': 1.0, **options})
+
+
+def test_retries_server_errors_until_success(server):
+    Handler.script['/flaky'] = [(503, {}), (502, {}), (200, {})]
+    response = transport().get(f"{server}/flaky")
+    assert response.status_code == 200
+    assert response.retries == 2
+
+
+def test_gives_up_after_max_retries(server):
+    Handler.script['/down'] = [(500, {})]
+    response = transport(max_retries=2, failure_threshold=10).get(f"{server}/down")
+    assert response.status_code == 500
+    assert Handler.hits['/down'] == 3
+
+
+def test_honours_short_retry_after(server):
+    Handler.script['/throttled'] = [(429, {'Retry-After': '0.2'}), (200, {})]
+    started = time.monotonic()
+    response = transport().get(f"{server}/throttled")
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.2
+
+
+def test_long_retry_after_opens_the_circuit(server):
+    Handler.script['/throttled'] = [(429, {'Retry-After': '120'})]
+    http = transport()
+    response = http.get(f"{server}/throttled")
+    assert response.status_code == 429
+    assert Handler.hits['/throttled'] == 1
+    with pytest.raises(CircuitOpenError):
+        http.get(f"{server}/throttled")
+
+
+def test_retry_after_http_date():
+    response = requests.Response()
+    response.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    assert retry_after_seconds(response) == 0.0
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_unexpected_error_releases_the_half_open_trial(server):
+    Handler.script['/loop'] = [(302, {'Location': '/loop'})]
+    http = transport(reset_timeout=0.05)
+    breaker = http.breaker('127.0.0.1')
+    breaker.opened_until = time.monotonic()
+    with pytest.raises(requests.TooManyRedirects):
+        http.get(f"{server}/loop")
+    assert breaker.allow()